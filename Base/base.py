@@ -1,9 +1,62 @@
 from django.db import models
+import copy
 import uuid
 
 def generate_uuid_hex():
     return uuid.uuid4().hex
 
+class DirtyFieldsMixin:
+    """
+    Remembers the field values an instance was loaded with, so ``save`` can
+    ask ``has_changed('featured_image')`` instead of re-reading the row.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_loaded_values()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._snapshot_loaded_values(fields)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._snapshot_loaded_values(kwargs.get('update_fields'))
+
+    def _snapshot_loaded_values(self, field_names=None):
+        if field_names is None:
+            fields = self._meta.concrete_fields
+            self._loaded_values = {}
+        else:
+            fields = [self._meta.get_field(name) for name in field_names]
+        # Deferred fields are not in __dict__ and are left out of the snapshot.
+        loaded_values = getattr(self, '_loaded_values', {})
+        for field in fields:
+            if field.attname in self.__dict__:
+                loaded_values[field.attname] = self._comparable_value(field)
+        self._loaded_values = loaded_values
+
+    def _comparable_value(self, field):
+        # get_prep_value turns FieldFile into its name, which stays stable
+        # even when the FieldFile object itself is mutated by a later save.
+        return copy.deepcopy(field.get_prep_value(getattr(self, field.attname)))
+
+    def has_changed(self, field_name):
+        """
+        True if ``field_name`` differs from the loaded value. New instances
+        always report a change.
+        """
+        if self._state.adding:
+            return True
+        field = self._meta.get_field(field_name)
+        loaded_values = getattr(self, '_loaded_values', {})
+        if field.attname not in loaded_values:
+            # Deferred at load time: changed only if it has been set since.
+            return field.attname in self.__dict__
+        return self._comparable_value(field) != loaded_values[field.attname]
+
 class HomeBaseModel(models.Model):
     id = models.UUIDField(default=generate_uuid_hex, editable=False, unique=True, primary_key=True)
     meta_title = models.CharField(max_length=200, null=True, blank=True)
@@ -15,4 +68,4 @@ class HomeBaseModel(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        abstract = True
\ No newline at end of file
+        abstract = True
@@ -1,5 +1,6 @@
+import base64
 from io import BytesIO
-from PIL import Image
+from PIL import Image, ImageOps
 import os
 from django.core.files.base import ContentFile
 
@@ -28,4 +29,68 @@ def optimize_image(image_field, target_kb=100, max_width=1000):
         return ContentFile(buffer.getvalue(), name=new_filename)
     except Exception as e:
         print(f"Error optimizing image: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def resize_image(image_file, width, quality=80, format='WEBP'):
+    """
+    Downscale ``image_file`` to ``width`` pixels wide (never upscaling) and
+    return the bytes encoded as ``format`` (WEBP, AVIF or JPEG).
+    """
+    img = Image.open(image_file)
+    # Let the JPEG decoder skip straight to a smaller scale where it can.
+    img.draft('RGB', (width, int(width * img.height / img.width) or 1))
+    img = ImageOps.exif_transpose(img)
+
+    if img.width > width:
+        new_height = max(1, int((width / img.width) * img.height))
+        img = img.resize((width, new_height), Image.Resampling.LANCZOS)
+
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+
+    buffer = BytesIO()
+    if format == 'JPEG':
+        if img.mode == 'RGBA':
+            # JPEG has no alpha channel; flatten onto white.
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel('A'))
+            img = background
+        img.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+    elif format == 'AVIF':
+        img.save(buffer, format='AVIF', quality=quality, speed=6)
+    else:
+        img.save(buffer, format='WEBP', quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def encode_image_bytes(name, data, **options):
+    """
+    Process-pool friendly wrapper around ``optimize_image``: takes plain
+    ``(name, bytes)`` and returns ``(name, bytes, metadata)`` where metadata
+    holds the width, height and placeholder of the encoded image.
+    """
+    optimized = optimize_image(ContentFile(data, name=name), **options)
+    if optimized is None:
+        raise ValueError(f"Could not process image {name}")
+    encoded = optimized.read()
+    img = Image.open(BytesIO(encoded))
+    metadata = {
+        'width': img.width,
+        'height': img.height,
+        'placeholder': image_placeholder(img),
+    }
+    return optimized.name, encoded, metadata
+
+
+def image_placeholder(img, size=16):
+    """
+    Return a tiny blurred preview of ``img`` as an inline WebP data URI
+    (a few hundred bytes), suitable for ``src`` while the real image loads.
+    """
+    thumb = img.copy()
+    thumb.thumbnail((size, size))
+    if thumb.mode != 'RGB':
+        thumb = thumb.convert('RGB')
+    buffer = BytesIO()
+    thumb.save(buffer, format='WEBP', quality=30)
+    return 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
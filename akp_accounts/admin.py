@@ -1,13 +1,12 @@
 from django.contrib import admin
-from .models import CustomUser, AdminLoginAttempt, NewsletterSubscriber, NewsletterIssue
+from .models import CustomUser, AdminLoginAttempt, NewsletterSubscriber, NewsletterIssue, NewsletterDelivery, OutboundEmail
+from .newsletter import queue_issue
 from .forms import LimitedConcurrentSessionAdminAuthenticationForm
 from django.conf import settings
 from django.contrib.admin import AdminSite
 from django.contrib import messages
 from django.utils import timezone
-from django.core.mail import send_mail, EmailMultiAlternatives
-from django.template.loader import render_to_string
-from django.urls import reverse
+from django.db.models import Count, Q
 
 class LimitedAdminSite(AdminSite):
     login_form = LimitedConcurrentSessionAdminAuthenticationForm
@@ -17,6 +16,23 @@ limited_admin_site.register(CustomUser)
 limited_admin_site.register(AdminLoginAttempt)
 
 
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'run_after', 'sent_at', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'recipients', 'last_error')
+    readonly_fields = ('created_at', 'locked_by', 'locked_at', 'sent_at', 'last_error')
+    actions = ['retry_emails']
+
+    def retry_emails(self, request, queryset):
+        queryset.filter(status=OutboundEmail.STATUS_FAILED).update(
+            status=OutboundEmail.STATUS_PENDING, attempts=0, run_after=timezone.now()
+        )
+    retry_emails.short_description = "Retry selected failed emails"
+
+
+limited_admin_site.register(OutboundEmail, OutboundEmailAdmin)
+
+
 class NewsLetterSubscriberAdmin(admin.ModelAdmin):
     list_display = ('email', 'is_active', 'subscribed_at', 'unsubscribed_at')
     list_filter = ('subscribed_at', 'is_active')
@@ -43,52 +59,20 @@ def send_newsletter_action(modeladmin, request, queryset):
             messages.warning(request, f"Newsletter '{issue.subject}' has already been sent.")
             continue
 
-        active_subscribers = NewsletterSubscriber.objects.filter(is_active=True)
-        receipients_data = [{'email': sub.email, 'token': str(sub.unsubscribe_token)} for sub in active_subscribers]
-
-        if not receipients_data:
+        recipients = queue_issue(issue)
+        if not recipients:
             messages.info(request, f"No active subscribers to send '{issue.subject}'.")
             continue
-        
-        try:
-            subject = issue.subject
-
-            sent_count = 0
-            for recipient in receipients_data:
-                unsubscribe_url = request.build_absolute_uri(
-                    reverse('unsubscribe_newsletter', kwargs={'token': recipient['token']})
-                )
-                context = {
-                    'issue_subject': subject,
-                    'unsubscribe_url': unsubscribe_url,
-                    'issue_content_html': issue.content_html,
-                }
-
-                html_content = render_to_string('newsletter_email.html', context)
-                text_content = render_to_string("newsletter_email.html", context)
-
-                msg = EmailMultiAlternatives(
-                    subject, 
-                    text_content, 
-                    "",
-                    [recipient['email']]
-                )
-                msg.attach_alternative(html_content, "text/html")
-                msg.send(fail_silently=False)
-                sent_count += 1
-
-            issue.is_sent = True
-            issue.sent_at = timezone.now()
-            issue.save()
-
-            messages.success(request, f"Newsletter '{issue.subject}' sent to {sent_count} subscribers.")
-        except Exception as e:
-            messages.error(request, f"Error sending newsletter '{issue.subject}': {e}")
-            continue
+
+        messages.success(
+            request,
+            f"Newsletter '{issue.subject}' queued for {recipients} subscribers; the Delivery column shows its progress."
+        )
+send_newsletter_action.short_description = "Send selected newsletters"
 
 
 class NewsletterIssueAdmin(admin.ModelAdmin):
-    list_display = ('subject', 'author', 'created_at', 'is_sent', 'sent_at')
+    list_display = ('subject', 'author', 'created_at', 'is_sent', 'sent_at', 'delivery')
     list_filter = ('is_sent', 'created_at', 'author')
     search_fields = ('subject', 'content_html', 'author__username')
     readonly_fields = ('sent_at',)
@@ -114,10 +98,38 @@ class NewsletterIssueAdmin(admin.ModelAdmin):
         })
     )
 
+    def get_queryset(self, request):
+        done = (NewsletterDelivery.STATUS_SENT, NewsletterDelivery.STATUS_SKIPPED)
+        return super().get_queryset(request).annotate(
+            deliveries_total=Count('deliveries'),
+            deliveries_done=Count('deliveries', filter=Q(deliveries__status__in=done)),
+            deliveries_failed=Count('deliveries', filter=Q(deliveries__status=NewsletterDelivery.STATUS_FAILED)),
+        )
+
+    @admin.display(description='Delivery')
+    def delivery(self, obj):
+        if not obj.deliveries_total:
+            return '-'
+        progress = f"{obj.deliveries_done}/{obj.deliveries_total} sent"
+        if obj.deliveries_failed:
+            progress += f", {obj.deliveries_failed} failed"
+        return progress
+
     def save_model(self, request, obj, form, change):
         if not obj.author_id:
             obj.author = request.user
         return super().save_model(request, obj, form, change)
     
 
-limited_admin_site.register(NewsletterIssue, NewsletterIssueAdmin)
\ No newline at end of file
+limited_admin_site.register(NewsletterIssue, NewsletterIssueAdmin)
+
+
+class NewsletterDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('email', 'issue', 'status', 'attempts', 'sent_at')
+    list_filter = ('status', 'issue')
+    list_select_related = ('issue',)
+    search_fields = ('email',)
+    readonly_fields = ('issue', 'subscriber', 'email', 'locked_by', 'locked_at', 'sent_at', 'last_error')
+
+
+limited_admin_site.register(NewsletterDelivery, NewsletterDeliveryAdmin)
\ No newline at end of file
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, register
+
+
+def shared_cache_aliases():
+    """
+    Cache aliases that every process must see the same copy of. Entries are
+    deleted by whichever process changes the data (a web worker, or
+    run_media_worker for the e-paper archive index) and the rate limiter
+    counts across workers, so a per-process cache would serve stale values.
+    """
+    aliases = {'default'}
+    if settings.SESSION_ENGINE == 'akp_accounts.sessions':
+        # Logging out deletes the session from this alias only.
+        aliases.add(settings.SESSION_CACHE_ALIAS)
+    return sorted(aliases)
+
+
+@register()
+def check_shared_caches(app_configs, **kwargs):
+    return [
+        Error(
+            f"Cache '{alias}' is a per-process LocMemCache but must be shared by all processes.",
+            hint="Configure a shared cache (memcached) for it.",
+            id='akp_accounts.E001',
+        )
+        for alias in shared_cache_aliases()
+        if isinstance(caches[alias], LocMemCache)
+    ]
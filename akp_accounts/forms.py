@@ -1,10 +1,8 @@
 from django import forms
 from django.contrib.auth.forms import AuthenticationForm
-from django.contrib.sessions.models import Session
-from django.utils import timezone
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
-from .models import AdminLoginAttempt
+from .models import AdminLoginAttempt, UserSession
 
 def get_client_ip(request):
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -46,14 +44,8 @@ class LimitedConcurrentSessionAdminAuthenticationForm(AuthenticationForm):
                     code='not_staff',
                 )
             
-            active_session_count = 0
-            all_sessions = Session.objects.filter(expire_date__gte=timezone.now())
+            active_session_count = UserSession.active_count(user)
 
-            for session in all_sessions:
-                session_data = session.get_decoded()
-                if str(session_data.get('_auth_user_id')) == str(user.pk):
-                    active_session_count += 1
-            
             max_sessions = getattr(settings, 'MAX_CONCURRENT_ADMIN_SESSIONS', 50)
 
             if active_session_count > max_sessions:
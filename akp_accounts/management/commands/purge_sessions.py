@@ -0,0 +1,47 @@
+"""
+Management command to delete expired sessions in small batches, so the
+session table never takes one long delete lock. Meant to run periodically
+(e.g. hourly from cron) in place of ``clearsessions``.
+"""
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Sessions deleted per statement (default: 1000)',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.1,
+            help='Seconds to sleep between batches (default: 0.1)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        now = timezone.now()
+        expired = Session.objects.filter(expire_date__lt=now).order_by('expire_date')
+
+        total = 0
+        while True:
+            keys = list(expired.values_list('session_key', flat=True)[:batch_size])
+            if not keys:
+                break
+            # Goes through the ORM so the UserSession rows are removed too.
+            Session.objects.filter(session_key__in=keys).delete()
+            total += len(keys)
+            if len(keys) < batch_size:
+                break
+            time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Deleted {total} expired session(s)'))
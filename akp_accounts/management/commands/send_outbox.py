@@ -0,0 +1,59 @@
+"""
+Management command that delivers queued emails (see akp_accounts/outbox.py)
+"""
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from akp_accounts.outbox import claim_batch, send_batch
+from akp_media.jobs import get_worker_id
+
+
+class Command(BaseCommand):
+    help = 'Send queued emails in batches over a shared connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50),
+            help='Emails sent per connection',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to sleep when the outbox is empty',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the outbox and exit instead of polling forever',
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+
+        def stop(signum, frame):
+            self.stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        batch_size = max(1, options['batch_size'])
+        worker_id = get_worker_id()
+        sent = 0
+        while not self.stopping:
+            close_old_connections()
+            emails = claim_batch(worker_id, batch_size)
+            if not emails:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+            sent += send_batch(emails)
+
+        self.stdout.write(self.style.SUCCESS(f"✓ [{worker_id}] sent {sent} email(s)"))
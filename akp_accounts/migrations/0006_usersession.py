@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# Index the sessions that are already open; this is the last time every
+# session has to be decoded.
+def index_open_sessions(apps, schema_editor):
+    from django.contrib.sessions.backends.db import SessionStore
+
+    Session = apps.get_model('sessions', 'Session')
+    UserSession = apps.get_model('akp_accounts', 'UserSession')
+    user_ids = set(apps.get_model('akp_accounts', 'CustomUser').objects.values_list('pk', flat=True))
+
+    decoder = SessionStore()
+    rows = []
+    for session_key, session_data in Session.objects.filter(expire_date__gte=timezone.now()).values_list('session_key', 'session_data').iterator():
+        user_id = decoder.decode(session_data).get('_auth_user_id')
+        if user_id is not None and int(user_id) in user_ids:
+            rows.append(UserSession(session_id=session_key, user_id=int(user_id)))
+    UserSession.objects.bulk_create(rows, batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('akp_accounts', '0005_alter_customuser_verification_token'),
+        ('sessions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSession',
+            fields=[
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='user_session', serialize=False, to='sessions.session')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Session',
+                'verbose_name_plural': 'User Sessions',
+            },
+        ),
+        migrations.RunPython(index_open_sessions, migrations.RunPython.noop),
+    ]
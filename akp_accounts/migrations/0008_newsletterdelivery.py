@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('akp_accounts', '0007_outboundemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsletterDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed'), ('skipped', 'Skipped')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('locked_by', models.CharField(blank=True, max_length=100)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('issue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='akp_accounts.newsletterissue')),
+                ('subscriber', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='deliveries', to='akp_accounts.newslettersubscriber')),
+            ],
+            options={
+                'verbose_name': 'Newsletter Delivery',
+                'verbose_name_plural': 'Newsletter Deliveries',
+                'ordering': ['issue', 'id'],
+                'indexes': [models.Index(fields=['issue', 'status'], name='newsletter_delivery_status')],
+                'constraints': [models.UniqueConstraint(fields=('issue', 'email'), name='unique_newsletter_delivery')],
+            },
+        ),
+    ]
@@ -1,7 +1,9 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.sessions.models import Session
 from django.conf import settings
 from django.urls import reverse
+from django.utils import timezone
 import uuid
 from django_ckeditor_5.fields import CKEditor5Field
 
@@ -57,6 +59,72 @@ class AdminLoginAttempt(models.Model):
         verbose_name_plural = "Admin Login Attempts"
         ordering = ['-timestamp']
 
+class UserSession(models.Model):
+    """
+    Which user a session belongs to, so a user's sessions can be counted
+    without decoding every session on the site. Rows are added and removed
+    by the login/logout signals and go with the Session row when it is
+    deleted or purged.
+    """
+    session = models.OneToOneField(Session, on_delete=models.CASCADE, primary_key=True, related_name='user_session')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='user_sessions')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "User Session"
+        verbose_name_plural = "User Sessions"
+
+    def __str__(self):
+        return f"{self.user} - {self.session_id}"
+
+    @classmethod
+    def active_count(cls, user):
+        return cls.objects.filter(user=user, session__expire_date__gte=timezone.now()).count()
+
+class OutboundEmail(models.Model):
+    """
+    An email waiting to be delivered by ``send_outbox``. Views only insert a
+    row, so no request waits on the SMTP server.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255, blank=True, help_text="Empty uses DEFAULT_FROM_EMAIL")
+    recipients = models.JSONField(default=list)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Outbound Email"
+        verbose_name_plural = "Outbound Emails"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='outbound_email_status_run'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.recipients)} ({self.status})"
+
 class NewsletterSubscriber(models.Model):
     email = models.EmailField(unique=True, max_length=255)
     is_active = models.BooleanField(default=True, help_text="Set to False to unsubscribe.")
@@ -98,4 +166,49 @@ class NewsletterIssue(models.Model):
     class Meta:
         verbose_name = "Newsletter Issue"
         verbose_name_plural = "Newsletter Issues"
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+
+class NewsletterDelivery(models.Model):
+    """
+    One subscriber's copy of a NewsletterIssue. The rows are created when
+    the issue is queued and updated chunk by chunk as the worker sends, so
+    an interrupted send resumes with the recipients that are still pending.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_SKIPPED = 'skipped'
+
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_SKIPPED, 'Skipped'),
+    )
+
+    issue = models.ForeignKey(NewsletterIssue, on_delete=models.CASCADE, related_name='deliveries')
+    subscriber = models.ForeignKey(NewsletterSubscriber, on_delete=models.SET_NULL, null=True, blank=True, related_name='deliveries')
+    email = models.EmailField(max_length=255)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = "Newsletter Delivery"
+        verbose_name_plural = "Newsletter Deliveries"
+        ordering = ['issue', 'id']
+        indexes = [
+            models.Index(fields=['issue', 'status'], name='newsletter_delivery_status'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['issue', 'email'], name='unique_newsletter_delivery'),
+        ]
+
+    def __str__(self):
+        return f"{self.issue} to {self.email} ({self.status})"
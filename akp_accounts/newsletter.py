@@ -0,0 +1,199 @@
+"""
+Newsletter fan-out.
+
+``queue_issue`` creates one NewsletterDelivery row per active subscriber and
+queues a 'newsletter.send_issue' job for ``run_media_worker``. The worker
+renders the email template once, with a placeholder where the unsubscribe
+link goes, and fills in each recipient's link with a string join. Recipients
+are claimed in chunks and sent over one pooled backend connection. Each
+delivery row is marked sent right after its message goes out, so a crash
+resumes with only the recipients still pending instead of sending the issue
+again.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F, Q
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from akp_media.jobs import enqueue_job, get_worker_id
+from .models import NewsletterDelivery, NewsletterSubscriber
+
+logger = logging.getLogger(__name__)
+
+UNSUBSCRIBE_PLACEHOLDER = '__AKP_UNSUBSCRIBE_URL__'
+
+
+def queue_issue(issue):
+    """
+    Create the missing delivery rows for ``issue`` and queue the send.
+    Returns the issue's total number of recipients.
+    """
+    subscribers = NewsletterSubscriber.objects.filter(is_active=True).values_list('pk', 'email')
+    NewsletterDelivery.objects.bulk_create(
+        (NewsletterDelivery(issue=issue, subscriber_id=pk, email=email) for pk, email in subscribers.iterator()),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    total = NewsletterDelivery.objects.filter(issue=issue).count()
+    if total:
+        enqueue_job('newsletter.send_issue', issue)
+    return total
+
+
+def unsubscribe_url(token):
+    return f"{settings.SITE_URL}{reverse('unsubscribe_newsletter', kwargs={'token': str(token)})}"
+
+
+class CompiledIssue:
+    """
+    The issue's HTML and text bodies, rendered once and split around the
+    unsubscribe link.
+    """
+
+    def __init__(self, issue):
+        self.subject = issue.subject
+        html = render_to_string('newsletter_email.html', {
+            'issue_subject': issue.subject,
+            'unsubscribe_url': UNSUBSCRIBE_PLACEHOLDER,
+            'issue_content_html': issue.content_html,
+        })
+        self.html_parts = html.split(UNSUBSCRIBE_PLACEHOLDER)
+        self.text_parts = strip_tags(html).split(UNSUBSCRIBE_PLACEHOLDER)
+
+    def message(self, email, token, connection):
+        url = unsubscribe_url(token)
+        message = EmailMultiAlternatives(
+            self.subject,
+            url.join(self.text_parts),
+            None,
+            [email],
+            connection=connection,
+            headers={'List-Unsubscribe': f'<{url}>'},
+        )
+        message.attach_alternative(url.join(self.html_parts), 'text/html')
+        return message
+
+
+def _claimable(now):
+    lease = getattr(settings, 'NEWSLETTER_DELIVERY_LEASE_SECONDS', 600)
+    return (
+        Q(status=NewsletterDelivery.STATUS_PENDING)
+        # A chunk left sending by a crashed worker is retried after the lease.
+        | Q(status=NewsletterDelivery.STATUS_SENDING, locked_at__lt=now - timedelta(seconds=lease))
+    )
+
+
+def claim_chunk(issue, worker_id, after, size):
+    now = timezone.now()
+    candidates = list(
+        NewsletterDelivery.objects.filter(_claimable(now), issue=issue, pk__gt=after)
+        .order_by('pk').values_list('pk', flat=True)[:size]
+    )
+    if not candidates:
+        return [], None
+    NewsletterDelivery.objects.filter(_claimable(now), pk__in=candidates).update(
+        status=NewsletterDelivery.STATUS_SENDING,
+        locked_by=worker_id,
+        locked_at=now,
+        attempts=F('attempts') + 1,
+    )
+    chunk = list(
+        NewsletterDelivery.objects.filter(pk__in=candidates, locked_by=worker_id, locked_at=now)
+        .select_related('subscriber').order_by('pk')
+    )
+    return chunk, candidates[-1]
+
+
+def send_chunk(compiled, chunk, connection):
+    """
+    Send ``chunk`` over ``connection``. Each recipient is marked sent as soon
+    as its message is accepted; the other outcomes are recorded with one
+    UPDATE per status, even if the pass is cut short. If the connection
+    can't be reopened after a failure the error propagates, the rest of the
+    chunk is released untried and the pass stops. Returns the number sent.
+    """
+    max_attempts = getattr(settings, 'NEWSLETTER_MAX_ATTEMPTS', 3)
+    deliveries = NewsletterDelivery.objects.filter(status=NewsletterDelivery.STATUS_SENDING)
+    sent, skipped, retry, failed = [], [], [], {}
+    try:
+        for delivery in chunk:
+            subscriber = delivery.subscriber
+            if subscriber is None or not subscriber.is_active:
+                skipped.append(delivery.pk)
+                continue
+            try:
+                connection.send_messages([compiled.message(delivery.email, subscriber.unsubscribe_token, connection)])
+            except Exception as e:
+                logger.warning(f"Could not send newsletter to {delivery.email}: {e}")
+                if delivery.attempts >= max_attempts:
+                    failed[delivery.pk] = ''.join(traceback.format_exception_only(type(e), e)).strip()
+                else:
+                    retry.append(delivery.pk)
+                # Don't let one broken connection fail the rest of the chunk.
+                connection.close()
+                connection.open()
+                continue
+            deliveries.filter(pk=delivery.pk).update(
+                status=NewsletterDelivery.STATUS_SENT, sent_at=timezone.now(), last_error=''
+            )
+            sent.append(delivery.pk)
+    finally:
+        if skipped:
+            deliveries.filter(pk__in=skipped).update(status=NewsletterDelivery.STATUS_SKIPPED, last_error='Unsubscribed')
+        if retry:
+            deliveries.filter(pk__in=retry).update(status=NewsletterDelivery.STATUS_PENDING, locked_by='', locked_at=None)
+        for pk, error in failed.items():
+            deliveries.filter(pk=pk).update(status=NewsletterDelivery.STATUS_FAILED, last_error=error)
+        done = set(sent) | set(skipped) | set(retry) | set(failed)
+        untried = [delivery.pk for delivery in chunk if delivery.pk not in done]
+        if untried:
+            deliveries.filter(pk__in=untried).update(
+                status=NewsletterDelivery.STATUS_PENDING, locked_by='', locked_at=None, attempts=F('attempts') - 1
+            )
+    return len(sent)
+
+
+def send_issue(issue):
+    """
+    Make one pass over the issue's pending recipients. Returns the number
+    still pending afterwards (recipients to retry on the next pass).
+    """
+    chunk_size = getattr(settings, 'NEWSLETTER_CHUNK_SIZE', 100)
+    worker_id = get_worker_id()
+    compiled = CompiledIssue(issue)
+
+    after = 0
+    connection = get_connection(fail_silently=False)
+    connection.open()
+    try:
+        while True:
+            chunk, after = claim_chunk(issue, worker_id, after, chunk_size)
+            if after is None:
+                break
+            send_chunk(compiled, chunk, connection)
+    finally:
+        connection.close()
+
+    remaining = NewsletterDelivery.objects.filter(
+        issue=issue, status__in=(NewsletterDelivery.STATUS_PENDING, NewsletterDelivery.STATUS_SENDING)
+    ).count()
+    if not remaining and not issue.is_sent:
+        type(issue).objects.filter(pk=issue.pk).update(is_sent=True, sent_at=timezone.now())
+    return remaining
+
+
+def fail_remaining(issue, error):
+    """
+    Mark the issue's unsent recipients failed once the send job has given
+    up, so they don't sit pending with nothing left to send them.
+    """
+    return NewsletterDelivery.objects.filter(
+        issue=issue, status__in=(NewsletterDelivery.STATUS_PENDING, NewsletterDelivery.STATUS_SENDING)
+    ).update(status=NewsletterDelivery.STATUS_FAILED, locked_by='', locked_at=None, last_error=error)
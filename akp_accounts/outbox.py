@@ -0,0 +1,134 @@
+"""
+Email outbox.
+
+Views call ``queue_email``, which only inserts an OutboundEmail row.
+``send_outbox`` claims pending rows in batches and delivers each batch over
+one connection from the configured EMAIL_BACKEND (SMTP in production,
+locmem/file backends work the same way in tests). Failed messages are
+retried with exponential backoff.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def queue_email(subject, message, recipient_list, from_email=None, html_message=None):
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        html_body=html_message or '',
+        from_email=from_email or '',
+        recipients=list(recipient_list),
+        max_attempts=getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5),
+    )
+
+
+def _claimable(now):
+    lease = getattr(settings, 'EMAIL_OUTBOX_LEASE_SECONDS', 300)
+    return (
+        Q(status=OutboundEmail.STATUS_PENDING, run_after__lte=now)
+        # Rows whose sender died mid-batch become claimable again after the lease.
+        | Q(status=OutboundEmail.STATUS_SENDING, locked_at__lt=now - timedelta(seconds=lease))
+    )
+
+
+def claim_batch(worker_id, size):
+    """
+    Claim up to ``size`` due emails with one conditional UPDATE, so several
+    senders can share the table without sending a message twice.
+    """
+    now = timezone.now()
+    candidates = list(
+        OutboundEmail.objects.filter(_claimable(now)).order_by('run_after').values_list('pk', flat=True)[:size]
+    )
+    if not candidates:
+        return []
+    OutboundEmail.objects.filter(_claimable(now), pk__in=candidates).update(
+        status=OutboundEmail.STATUS_SENDING,
+        locked_by=worker_id,
+        locked_at=now,
+        attempts=F('attempts') + 1,
+    )
+    return list(OutboundEmail.objects.filter(pk__in=candidates, locked_by=worker_id, locked_at=now))
+
+
+def build_message(email, connection):
+    message = EmailMultiAlternatives(
+        email.subject,
+        email.body,
+        email.from_email or None,
+        email.recipients,
+        connection=connection,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def send_batch(emails):
+    """
+    Deliver ``emails`` over a single backend connection. Returns the number
+    sent; failures are rescheduled or marked failed individually.
+    """
+    if not emails:
+        return 0
+    sent = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+        for email in emails:
+            try:
+                connection.send_messages([build_message(email, connection)])
+            except Exception as e:
+                logger.warning(f"Could not send outbound email {email.pk}: {e}")
+                _mark_failed(email, e)
+                # The connection may be unusable after an error; start afresh.
+                connection.close()
+                connection.open()
+                continue
+            OutboundEmail.objects.filter(pk=email.pk, locked_by=email.locked_by).update(
+                status=OutboundEmail.STATUS_SENT,
+                sent_at=timezone.now(),
+                last_error='',
+            )
+            sent += 1
+    except Exception as e:
+        # Could not (re)connect: everything not yet sent is retried later.
+        logger.exception("Email backend unavailable")
+        unsent = set(OutboundEmail.objects.filter(
+            pk__in=[email.pk for email in emails], status=OutboundEmail.STATUS_SENDING
+        ).values_list('pk', flat=True))
+        for email in emails:
+            if email.pk in unsent:
+                _mark_failed(email, e)
+    finally:
+        connection.close()
+    return sent
+
+
+def _mark_failed(email, error):
+    now = timezone.now()
+    details = ''.join(traceback.format_exception_only(type(error), error)).strip()
+    emails = OutboundEmail.objects.filter(pk=email.pk, locked_by=email.locked_by)
+
+    if email.attempts >= email.max_attempts:
+        emails.update(status=OutboundEmail.STATUS_FAILED, last_error=details)
+        return
+
+    delay = getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 60) * 2 ** (email.attempts - 1)
+    emails.update(
+        status=OutboundEmail.STATUS_PENDING,
+        run_after=now + timedelta(seconds=delay),
+        locked_by='',
+        locked_at=None,
+        last_error=details,
+    )
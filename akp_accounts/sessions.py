@@ -0,0 +1,161 @@
+"""
+Session engine for the site (SESSION_ENGINE = "akp_accounts.sessions").
+
+Cached, database-backed sessions like ``cached_db``, with two additions:
+
+* a small per-process L1 in front of the shared cache, so repeated requests
+  from a reader don't even make a cache round trip. Entries live for
+  SESSION_LOCAL_CACHE_TIMEOUT seconds, which bounds how long another
+  process can still see a session after it has been logged out.
+* write coalescing: a save that would only move the expiry date by less
+  than SESSION_EXPIRY_WRITE_GRACE seconds, with the data unchanged, is
+  skipped instead of rewriting the django_session row.
+
+The cache behind it (SESSION_CACHE_ALIAS) must be shared by all processes,
+or a logout would only evict the session in one of them; the
+akp_accounts.E001 system check enforces that.
+"""
+import copy
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.core.cache import caches
+
+KEY_PREFIX = 'akp_accounts.sessions'
+
+logger = logging.getLogger(__name__)
+
+
+class LocalSessionCache:
+    def __init__(self, timeout, max_entries):
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return copy.deepcopy(entry[1])
+
+    def set(self, key, value):
+        if self.timeout <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.timeout, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+local_cache = LocalSessionCache(
+    timeout=getattr(settings, 'SESSION_LOCAL_CACHE_TIMEOUT', 5),
+    max_entries=getattr(settings, 'SESSION_LOCAL_CACHE_SIZE', 10000),
+)
+
+
+class SessionStore(DBStore):
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        self._cache = caches[settings.SESSION_CACHE_ALIAS]
+        # (digest of the data, expire date) as last read from or written to the row
+        self._stored = None
+        super().__init__(session_key)
+
+    @property
+    def cache_key(self):
+        return self.cache_key_prefix + self._get_or_create_session_key()
+
+    def _digest(self, data):
+        return hashlib.sha1(self.serializer().dumps(data)).hexdigest()
+
+    def _remember(self, data, expire_date):
+        entry = (data, expire_date)
+        local_cache.set(self.cache_key, entry)
+        self._stored = (self._digest(data), expire_date)
+        return entry
+
+    def load(self):
+        entry = local_cache.get(self.cache_key)
+        if entry is None:
+            try:
+                entry = self._cache.get(self.cache_key)
+            except Exception:
+                # Some backends raise on invalid cache keys; see cached_db.
+                entry = None
+
+            if entry is None:
+                s = self._get_session_from_db()
+                if s is None:
+                    self._stored = None
+                    return {}
+                entry = (self.decode(s.session_data), s.expire_date)
+                try:
+                    self._cache.set(self.cache_key, entry, self.get_expiry_age(expiry=s.expire_date))
+                except Exception:
+                    # The row has been read; serve it even with the cache down.
+                    logger.exception("Error saving to cache (%s)", self._cache)
+
+        data, _ = self._remember(*entry)
+        return copy.deepcopy(data)
+
+    def exists(self, session_key):
+        if not session_key:
+            return False
+        key = self.cache_key_prefix + session_key
+        return local_cache.get(key) is not None or key in self._cache or super().exists(session_key)
+
+    def save(self, must_create=False):
+        if not must_create and self.session_key and self._stored is not None:
+            digest, expire_date = self._stored
+            grace = getattr(settings, 'SESSION_EXPIRY_WRITE_GRACE', 300)
+            moved = abs((self.get_expiry_date() - expire_date).total_seconds())
+            if moved < grace and digest == self._digest(self._get_session()):
+                return
+
+        super().save(must_create)
+        entry = self._remember(self._session, self.get_expiry_date())
+        try:
+            self._cache.set(self.cache_key, entry, self.get_expiry_age())
+        except Exception:
+            logger.exception("Error saving to cache (%s)", self._cache)
+
+    def delete(self, session_key=None):
+        super().delete(session_key)
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        local_cache.delete(self.cache_key_prefix + session_key)
+        self._cache.delete(self.cache_key_prefix + session_key)
+        self._stored = None
+
+    def flush(self):
+        """
+        Remove the current session data from the database and regenerate the
+        key.
+        """
+        self.clear()
+        self.delete(self.session_key)
+        self._session_key = None
+
+    def cycle_key(self):
+        # The data moves to a new row; the next save must not be skipped.
+        self._stored = None
+        super().cycle_key()
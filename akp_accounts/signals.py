@@ -0,0 +1,15 @@
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.dispatch import receiver
+from .models import UserSession
+
+@receiver(user_logged_in)
+def index_user_session(sender, request, user, **kwargs):
+    session_key = request.session.session_key
+    if session_key:
+        UserSession.objects.update_or_create(session_id=session_key, defaults={'user': user})
+
+@receiver(user_logged_out)
+def drop_user_session(sender, request, user, **kwargs):
+    session_key = request.session.session_key
+    if session_key:
+        UserSession.objects.filter(session_id=session_key).delete()
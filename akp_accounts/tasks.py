@@ -0,0 +1,16 @@
+from akp_media.jobs import register_task
+from .newsletter import fail_remaining, send_issue
+
+
+@register_task('newsletter.send_issue')
+def send_newsletter_issue(issue, job):
+    try:
+        remaining = send_issue(issue)
+        if remaining:
+            # Failing the job schedules another pass with the media queue's backoff.
+            raise RuntimeError(f"{remaining} newsletter recipient(s) still pending")
+    except Exception as e:
+        if job.attempts >= job.max_attempts:
+            # This was the last pass the media queue will run.
+            fail_remaining(issue, f"Send job gave up after {job.attempts} attempts: {e}")
+        raise
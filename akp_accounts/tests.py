@@ -1,3 +1,152 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from akp_media.jobs import claim_next_job, run_job
+from akp_media.models import MediaJob
+from .checks import check_shared_caches
+from .models import NewsletterDelivery, NewsletterIssue, NewsletterSubscriber, OutboundEmail
+from .newsletter import queue_issue
+from .sessions import SessionStore, local_cache
+from .outbox import claim_batch, queue_email, send_batch
+from .utils import send_verification_mail
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_OUTBOX_MAX_ATTEMPTS=3,
+    EMAIL_OUTBOX_RETRY_DELAY=60,
+)
+class OutboxTests(TestCase):
+
+    def queue(self, count=1):
+        return [queue_email(f'Subject {i}', 'Body', [f'user{i}@example.com']) for i in range(count)]
+
+    def test_views_only_insert_rows(self):
+        request = RequestFactory().get('/account/register/')
+        with self.assertNumQueries(1):
+            send_verification_mail(request, 'reader@example.com', 'token', '123456')
+        self.assertEqual(mail.outbox, [])
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, OutboundEmail.STATUS_PENDING)
+        self.assertEqual(email.recipients, ['reader@example.com'])
+
+    def test_claim_batch_does_not_double_claim(self):
+        self.queue(5)
+        first = claim_batch('worker-a', 3)
+        second = claim_batch('worker-b', 3)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 2)
+        self.assertFalse({email.pk for email in first} & {email.pk for email in second})
+        self.assertEqual(claim_batch('worker-c', 3), [])
+        self.assertEqual(
+            set(OutboundEmail.objects.values_list('status', 'attempts')),
+            {(OutboundEmail.STATUS_SENDING, 1)},
+        )
+
+    def test_send_batch_delivers_over_the_backend(self):
+        queue_email('Hello', 'Text', ['reader@example.com'], html_message='<p>Text</p>')
+        self.assertEqual(send_batch(claim_batch('worker', 10)), 1)
+
+        self.assertEqual(len(mail.outbox), 1)
+        message = mail.outbox[0]
+        self.assertEqual(message.subject, 'Hello')
+        self.assertEqual(message.to, ['reader@example.com'])
+        self.assertEqual(message.alternatives[0][0], '<p>Text</p>')
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, OutboundEmail.STATUS_SENT)
+        self.assertIsNotNone(email.sent_at)
+
+    def test_failures_back_off_then_fail(self):
+        self.queue()
+        with mock.patch.object(EmailBackend, 'send_messages', side_effect=OSError('Connection refused')):
+            for attempt in (1, 2):
+                before = timezone.now()
+                self.assertEqual(send_batch(claim_batch('worker', 10)), 0)
+                email = OutboundEmail.objects.get()
+                self.assertEqual(email.status, OutboundEmail.STATUS_PENDING)
+                self.assertEqual(email.attempts, attempt)
+                self.assertIn('Connection refused', email.last_error)
+                self.assertGreaterEqual(email.run_after, before + timedelta(seconds=60 * 2 ** (attempt - 1)))
+                # Not due again until the backoff has passed.
+                self.assertEqual(claim_batch('worker', 10), [])
+                OutboundEmail.objects.update(run_after=timezone.now())
+
+            send_batch(claim_batch('worker', 10))
+
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, OutboundEmail.STATUS_FAILED)
+        self.assertEqual(email.attempts, 3)
+        self.assertEqual(claim_batch('worker', 10), [])
+        self.assertEqual(mail.outbox, [])
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', MEDIA_JOB_MAX_ATTEMPTS=2)
+class NewsletterSendJobTests(TestCase):
+
+    def test_exhausted_job_fails_the_remaining_deliveries(self):
+        for i in range(3):
+            NewsletterSubscriber.objects.create(email=f'reader{i}@example.com')
+        issue = NewsletterIssue.objects.create(subject='Issue 1', content_html='<p>News</p>')
+        self.assertEqual(queue_issue(issue), 3)
+
+        with mock.patch.object(EmailBackend, 'open', side_effect=OSError('Connection refused')):
+            for attempt in (1, 2):
+                MediaJob.objects.update(run_after=timezone.now())
+                self.assertFalse(run_job(claim_next_job('worker')))
+                statuses = set(NewsletterDelivery.objects.values_list('status', flat=True))
+                if attempt == 1:
+                    # The job is retried; the recipients wait for it.
+                    self.assertEqual(statuses, {NewsletterDelivery.STATUS_PENDING})
+
+        self.assertEqual(MediaJob.objects.get().status, MediaJob.STATUS_FAILED)
+        self.assertEqual(statuses, {NewsletterDelivery.STATUS_FAILED})
+        self.assertIn('Connection refused', NewsletterDelivery.objects.first().last_error)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'session-tests'}},
+    SESSION_CACHE_ALIAS='default',
+)
+class SessionStoreTests(TestCase):
+
+    def test_load_survives_a_cache_outage(self):
+        session = SessionStore()
+        session['user'] = 'reader'
+        session.save()
+        local_cache.delete(session.cache_key)
+
+        store = SessionStore(session.session_key)
+        with mock.patch.object(store._cache, 'get', side_effect=OSError('Connection refused')), \
+                mock.patch.object(store._cache, 'set', side_effect=OSError('Connection refused')):
+            self.assertEqual(store.load(), {'user': 'reader'})
+
+
+LOCMEM = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+MEMCACHED = {'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache', 'LOCATION': '127.0.0.1:11211'}
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+
+    def aliases(self):
+        return [error.msg.split("'")[1] for error in check_shared_caches(None)]
+
+    def test_one_error_per_per_process_alias(self):
+        with override_settings(CACHES={'default': LOCMEM}, SESSION_CACHE_ALIAS='default'):
+            self.assertEqual(self.aliases(), ['default'])
+        with override_settings(CACHES={'default': MEMCACHED, 'sessions': LOCMEM}, SESSION_CACHE_ALIAS='sessions'):
+            self.assertEqual(self.aliases(), ['sessions'])
+        with override_settings(CACHES={'default': MEMCACHED}, SESSION_CACHE_ALIAS='default'):
+            self.assertEqual(self.aliases(), [])
+
+    @override_settings(
+        CACHES={'default': MEMCACHED, 'sessions': LOCMEM},
+        SESSION_CACHE_ALIAS='sessions',
+        SESSION_ENGINE='django.contrib.sessions.backends.db',
+    )
+    def test_session_alias_only_with_the_cached_engine(self):
+        self.assertEqual(self.aliases(), [])
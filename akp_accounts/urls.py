@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import login_attempt, logout_attempt, register_attempt, newsletter_subscribers, verify_account
+from .views import login_attempt, logout_attempt, register_attempt, newsletter_subscribers, verify_account, unsubscribe_newsletter
 
 urlpatterns = [
     path('login/', login_attempt, name="login"),
@@ -7,4 +7,5 @@ urlpatterns = [
     path('register/', register_attempt, name="register"),
     path('newsletter/', newsletter_subscribers, name="newsletter_subscribers"),
     path('verify-account/<str:token>/', verify_account, name="verify_account"),
+    path('newsletter/unsubscribe/<uuid:token>/', unsubscribe_newsletter, name="unsubscribe_newsletter"),
 ]
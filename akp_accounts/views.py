@@ -1,4 +1,5 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
+from django.utils import timezone
 from django.contrib.auth import authenticate, login, logout
 from django.http import JsonResponse
 from .models import CustomUser, NewsletterSubscriber
@@ -125,4 +126,20 @@ def newsletter_subscribers(request):
             return JsonResponse({'status': 'error', 'message': 'Email already subscribed'}, status=400)
         
         NewsletterSubscriber.objects.create(email=email)
-        return JsonResponse({'status': 'success', 'message': 'Subscribed successfully'}, status=200)
\ No newline at end of file
+        return JsonResponse({'status': 'success', 'message': 'Subscribed successfully'}, status=200)
+
+
+def unsubscribe_newsletter(request, token):
+    subscriber = get_object_or_404(NewsletterSubscriber, unsubscribe_token=token)
+
+    # Mail scanners follow links, so only a POST unsubscribes.
+    unsubscribed = not subscriber.is_active
+    if request.method == "POST" and subscriber.is_active:
+        NewsletterSubscriber.objects.filter(pk=subscriber.pk).update(is_active=False, unsubscribed_at=timezone.now())
+        unsubscribed = True
+
+    context = {
+        'subscriber': subscriber,
+        'unsubscribed': unsubscribed,
+    }
+    return render(request, template_name="account/newsletter_unsubscribe.html", context=context)
@@ -17,9 +17,10 @@ class ShortURLInline(admin.TabularInline):
     readonly_fields = ('short_url', 'created_at')
 
 class EpaperAdmin(admin.ModelAdmin):
-    list_display = ('meta_title', 'timestamp', 'is_active', 'get_short_url')
+    list_display = ('meta_title', 'timestamp', 'edition', 'is_active', 'get_short_url')
     search_fields = ('meta_title',)
-    list_filter = ('is_active', 'timestamp')
+    list_filter = ('is_active', 'timestamp', 'edition')
+    readonly_fields = ('original_file', 'original_size', 'file_size', 'page_count')
     inlines = [ShortURLInline, EpaperDownloadInline]
 
     def get_short_url(self, obj):
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AkpEpapersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "akp_epapers"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,93 @@
+"""
+Compact, cached index of the active e-papers for archive browsing.
+
+The index holds one small tuple per e-paper, newest first, so sidebars,
+the month calendar and "latest N" lists are served from the cache instead
+of scanning the Epaper table. It is dropped whenever an e-paper or short
+URL changes and rebuilt on the next read. The drop waits for the commit, so
+a request racing the save can't put the old rows back, and it goes to the
+shared cache, so it reaches every worker.
+"""
+import calendar
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+
+from .models import Epaper
+
+INDEX_CACHE_KEY = 'epapers:archive_index'
+
+
+def archive_rows():
+    """
+    Active e-papers newest first, as index rows. Served by the
+    (is_active, timestamp) index.
+    """
+    # Thumbnail storage names, not URLs: signed storage URLs would expire in the cache.
+    return (
+        Epaper.objects.filter(is_active=True, timestamp__isnull=False)
+        .order_by('-timestamp', '-created_at')
+        .values_list('id', 'timestamp', 'meta_title', 'edition', 'meta_image', 'short_url__short_url')
+    )
+
+
+def archive_index():
+    index = cache.get(INDEX_CACHE_KEY)
+    if index is None:
+        index = list(archive_rows())
+        cache.set(INDEX_CACHE_KEY, index, getattr(settings, 'EPAPER_ARCHIVE_CACHE_TIMEOUT', 60 * 60))
+    return index
+
+
+def invalidate_archive_index():
+    transaction.on_commit(lambda: cache.delete(INDEX_CACHE_KEY))
+
+
+def archive_entry(row):
+    epaper_id, date, title, edition, thumbnail, short_code = row
+    return {
+        'id': str(epaper_id),
+        'date': date,
+        'title': title,
+        'edition': edition,
+        'thumbnail': Epaper._meta.get_field('meta_image').storage.url(thumbnail) if thumbnail else None,
+        'short_code': short_code,
+        'url': reverse('view_epaper', kwargs={'epaper_id': epaper_id}),
+    }
+
+
+def latest_epapers(count):
+    return [archive_entry(row) for row in archive_index()[:count]]
+
+
+def month_calendar(year, month):
+    """
+    The e-papers of one month laid out as calendar weeks (Monday first),
+    plus the neighbouring months that have e-papers.
+    """
+    first = datetime.date(year, month, 1)
+    last = first.replace(day=calendar.monthrange(year, month)[1])
+
+    days = {}
+    previous_month = next_month = None
+    for row in archive_index():
+        date = row[1]
+        if date > last:
+            next_month = date
+        elif date < first:
+            previous_month = date
+            break
+        else:
+            days.setdefault(date.day, []).append(archive_entry(row))
+
+    return {
+        'year': year,
+        'month': month,
+        'weeks': calendar.Calendar().monthdayscalendar(year, month),
+        'days': days,
+        'previous': previous_month.strftime('%Y-%m') if previous_month else None,
+        'next': next_month.strftime('%Y-%m') if next_month else None,
+    }
@@ -0,0 +1,138 @@
+"""
+Bulk loading of back-issue e-paper PDFs.
+
+Each PDF is prepared end to end in a worker process (thumbnail, optimised
+and linearised copy, page renditions, page text) and written to a scratch
+directory. The parent process uploads the results and inserts Epaper,
+ShortURL and EpaperPage rows in batches, so no per-row save() processing or
+media jobs are involved.
+"""
+import datetime
+import json
+import os
+import re
+
+import pymupdf  # PyMuPDF for PDF manipulation
+
+from .utils import extract_page_text, generate_thumbnail, render_page_images, web_pdf
+
+DATE_PATTERNS = (
+    # 2024-03-12, 2024_03_12, 20240312
+    (re.compile(r'(?<!\d)(\d{4})[-_.]?(\d{2})[-_.]?(\d{2})(?!\d)'), ('year', 'month', 'day')),
+    # 12-03-2024
+    (re.compile(r'(?<!\d)(\d{2})[-_.](\d{2})[-_.](\d{4})(?!\d)'), ('day', 'month', 'year')),
+)
+
+
+def date_from_filename(name):
+    for pattern, order in DATE_PATTERNS:
+        for match in pattern.finditer(name):
+            parts = dict(zip(order, map(int, match.groups())))
+            try:
+                return datetime.date(parts['year'], parts['month'], parts['day'])
+            except ValueError:
+                continue
+    return None
+
+
+def find_pdfs(directory):
+    """
+    ``[(relative_path, date), ...]`` for every dated PDF under ``directory``,
+    oldest first, plus the relative paths that carry no recognisable date.
+    """
+    dated, undated = [], []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.lower().endswith('.pdf'):
+                continue
+            relative_path = os.path.relpath(os.path.join(root, name), directory)
+            date = date_from_filename(relative_path)
+            if date is None:
+                undated.append(relative_path)
+            else:
+                dated.append((relative_path, date))
+    dated.sort(key=lambda item: (item[1], item[0]))
+    return dated, undated
+
+
+def prepare_epaper(pdf_path, work_dir, pdf_options, widths, tile_size, quality):
+    """
+    Do all the CPU work for one PDF and leave the outputs in ``work_dir``.
+    Runs in a worker process and only returns paths and metadata, so no
+    large byte strings are pickled back to the parent.
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    with open(pdf_path, 'rb') as pdf_file:
+        data = pdf_file.read()
+
+    with pymupdf.open(stream=data, filetype="pdf") as document:
+        page_count = document.page_count
+        thumbnail = generate_thumbnail(document, 'meta.webp')
+    if thumbnail is None:
+        return None
+
+    thumbnail_path = os.path.join(work_dir, 'meta.webp')
+    with open(thumbnail_path, 'wb') as image_file:
+        image_file.write(thumbnail.read())
+
+    served = web_pdf(data, **pdf_options)
+    served_path = None
+    if served is not data:
+        served_path = os.path.join(work_dir, 'served.pdf')
+        with open(served_path, 'wb') as served_file:
+            served_file.write(served)
+
+    # Renditions and text come from the file that will be served.
+    source_path = served_path or pdf_path
+    pages, texts, page_files = [], [], []
+    for index in range(page_count):
+        entry, files = render_page_images(source_path, index, widths, tile_size, quality)
+        for name, content in files:
+            with open(os.path.join(work_dir, name), 'wb') as image_file:
+                image_file.write(content)
+            page_files.append(name)
+        pages.append(entry)
+        texts.append(extract_page_text(source_path, index))
+
+    return {
+        'page_count': page_count,
+        'original_size': len(data),
+        'file_size': len(served),
+        'thumbnail_path': thumbnail_path,
+        'served_path': served_path,
+        'pages': pages,
+        'page_files': page_files,
+        'texts': texts,
+    }
+
+
+class Ledger:
+    """
+    Append-only JSON-lines record of the PDFs already loaded, so an
+    interrupted backfill resumes where it stopped.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def done(self):
+        if not os.path.exists(self.path):
+            return set()
+        done = set()
+        with open(self.path, encoding='utf-8') as ledger_file:
+            for line in ledger_file:
+                try:
+                    done.add(json.loads(line)['path'])
+                except (ValueError, KeyError):
+                    # A line torn by the interruption; that batch is redone.
+                    continue
+        return done
+
+    def record(self, entries):
+        with open(self.path, 'a', encoding='utf-8') as ledger_file:
+            for entry in entries:
+                ledger_file.write(json.dumps(entry) + '\n')
+            ledger_file.flush()
+            os.fsync(ledger_file.fileno())
+
@@ -0,0 +1,91 @@
+"""
+Write-light e-paper download accounting.
+
+The per-user counter is bumped with a single conditional UPDATE that also
+enforces the limit, so concurrent clicks can't overshoot it and the rest of
+the user row is never rewritten. The EpaperDownload audit rows are buffered
+per process and bulk-inserted by a background flusher every few seconds;
+a crash can lose at most that window of audit rows, never a counted download.
+"""
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.db.models import F
+
+from akp_accounts.models import CustomUser
+from .models import EpaperDownload
+
+logger = logging.getLogger(__name__)
+
+
+def count_download(user):
+    """
+    Count one download against ``user``'s limit. Returns False, without
+    writing anything, if the limit has already been reached.
+    """
+    limit = getattr(settings, 'EPAPER_DOWNLOAD_LIMIT', 365)
+    updated = CustomUser.objects.filter(pk=user.pk, epaper_downloads__lt=limit).update(
+        epaper_downloads=F('epaper_downloads') + 1
+    )
+    return bool(updated)
+
+
+class DownloadRecorder:
+    def __init__(self, flush_interval, max_buffer):
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+
+    def record(self, epaper_id, customer_id, ip_addr=None):
+        with self._lock:
+            self._buffer.append(EpaperDownload(epaper_id=epaper_id, customer_id=customer_id, ip_addr=ip_addr))
+            full = len(self._buffer) >= self.max_buffer
+        self._ensure_flusher()
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+        try:
+            EpaperDownload.objects.bulk_create(rows, batch_size=500)
+        except DatabaseError:
+            logger.exception(f"Could not write {len(rows)} e-paper download row(s)")
+            with self._lock:
+                # Retry on the next flush, but don't grow without bound.
+                self._buffer[:0] = rows[-self.max_buffer * 10:]
+            return 0
+        return len(rows)
+
+    def _ensure_flusher(self):
+        # One flusher thread per process; a forked worker starts its own.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='epaper-download-flusher', daemon=True).start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            close_old_connections()
+            self.flush()
+
+
+recorder = DownloadRecorder(
+    flush_interval=getattr(settings, 'EPAPER_DOWNLOAD_FLUSH_INTERVAL', 5),
+    max_buffer=getattr(settings, 'EPAPER_DOWNLOAD_BUFFER_SIZE', 200),
+)
+atexit.register(recorder.flush)
@@ -0,0 +1,201 @@
+"""
+Management command to load a directory of dated back-issue PDFs as e-papers
+"""
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from akp_epapers.archive import invalidate_archive_index
+from akp_epapers.backfill import Ledger, find_pdfs, prepare_epaper
+from akp_epapers.models import Epaper, EpaperPage, ShortURL
+from akp_epapers.tasks import pages_folder, pdf_options, served_pdf_name
+
+
+class Command(BaseCommand):
+    help = 'Load back-issue PDFs (dated by filename, e.g. 2024-03-12.pdf) as e-papers on a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Directory searched recursively for PDFs')
+        parser.add_argument(
+            '--edition',
+            default='',
+            help='Edition name stored on every e-paper',
+        )
+        parser.add_argument(
+            '--inactive',
+            action='store_true',
+            help='Create the e-papers unpublished',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Processing processes (defaults to the number of CPU cores)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=25,
+            help='E-papers inserted per transaction',
+        )
+        parser.add_argument(
+            '--ledger',
+            help='Progress file used to resume (defaults to .epaper_backfill.jsonl in the directory)',
+        )
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        if not os.path.isdir(directory):
+            raise CommandError(f"{directory} is not a directory")
+
+        ledger = Ledger(options['ledger'] or os.path.join(directory, '.epaper_backfill.jsonl'))
+        dated, undated = find_pdfs(directory)
+        for relative_path in undated:
+            self.stdout.write(self.style.WARNING(f"Skipping {relative_path}: no date in the filename"))
+
+        done = ledger.done()
+        todo = [(relative_path, date) for relative_path, date in dated if relative_path not in done]
+        self.stdout.write(f"{len(todo)} PDF(s) to load, {len(done)} already loaded")
+        if not todo:
+            return
+
+        self.options = options
+        self.widths = tuple(settings.EPAPER_PAGE_WIDTHS)
+        workers = options['workers'] or os.cpu_count() or 1
+        prepare_args = (pdf_options(), self.widths, settings.EPAPER_PAGE_TILE_SIZE, settings.EPAPER_PAGE_QUALITY)
+
+        started = time.monotonic()
+        self.loaded = self.pages = self.failed = 0
+        work_root = tempfile.mkdtemp(prefix='epaper-backfill-')
+        # Workers never touch the database; don't hand them open connections.
+        connections.close_all()
+
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool, ThreadPoolExecutor(max_workers=8) as uploads:
+                queue = iter(enumerate(todo))
+                pending = {}
+                batch = []
+
+                def fill():
+                    # Keep a couple of PDFs per worker in flight to bound scratch space.
+                    for index, (relative_path, date) in queue:
+                        work_dir = os.path.join(work_root, str(index))
+                        future = pool.submit(
+                            prepare_epaper, os.path.join(directory, relative_path), work_dir, *prepare_args
+                        )
+                        pending[future] = (relative_path, date, work_dir)
+                        if len(pending) >= workers * 2:
+                            break
+
+                fill()
+                while pending:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        relative_path, date, work_dir = pending.pop(future)
+                        try:
+                            result = future.result()
+                            if result is None:
+                                raise ValueError("the PDF has no pages")
+                            batch.append(self.store(directory, relative_path, date, work_dir, result, uploads))
+                        except Exception as e:
+                            self.failed += 1
+                            self.stderr.write(f"✗ {relative_path}: {e}")
+                        finally:
+                            shutil.rmtree(work_dir, ignore_errors=True)
+
+                        if len(batch) >= options['batch_size']:
+                            self.flush(batch, ledger, started)
+                            batch = []
+                    fill()
+
+                if batch:
+                    self.flush(batch, ledger, started)
+        finally:
+            shutil.rmtree(work_root, ignore_errors=True)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ Loaded {self.loaded} e-paper(s), {self.pages} pages in {elapsed:.1f}s "
+                f"({self.pages / elapsed:.2f} pages/s)"
+                + (f"; {self.failed} failed and will be retried on the next run" if self.failed else '')
+            )
+        )
+
+    def store(self, directory, relative_path, date, work_dir, result, uploads):
+        """
+        Upload the prepared files and build the unsaved rows for one PDF.
+        """
+        filename = os.path.basename(relative_path)
+        epaper = Epaper(
+            timestamp=date,
+            edition=self.options['edition'],
+            is_active=not self.options['inactive'],
+            meta_title=filename,
+            page_count=result['page_count'],
+            original_size=result['original_size'],
+            file_size=result['file_size'],
+        )
+
+        file_field = Epaper._meta.get_field('file')
+        original_name = self.upload(file_field, epaper, filename, os.path.join(directory, relative_path))
+        if result['served_path']:
+            epaper.original_file = original_name
+            served_name = served_pdf_name(epaper, original_name)
+            epaper.file = self.upload(file_field, epaper, served_name, result['served_path'])
+        else:
+            epaper.file = original_name
+
+        epaper.meta_image = self.upload(
+            Epaper._meta.get_field('meta_image'), epaper, f"meta_{epaper.id}.webp", result['thumbnail_path']
+        )
+
+        storage = file_field.storage
+        folder = pages_folder(epaper, epaper.file.name)
+
+        def upload_page_file(name):
+            with open(os.path.join(work_dir, name), 'rb') as page_file:
+                return storage.save(f"{folder}/{name}", File(page_file))
+
+        names = dict(zip(result['page_files'], uploads.map(upload_page_file, result['page_files'])))
+        for entry in result['pages']:
+            entry['images'] = {width: names[name] for width, name in entry['images'].items()}
+            if 'tiles' in entry:
+                entry['tiles']['names'] = [names[name] for name in entry['tiles']['names']]
+        epaper.pages_manifest = {'source': epaper.file.name, 'widths': sorted(self.widths), 'pages': result['pages']}
+
+        pages = [EpaperPage(epaper=epaper, **text) for text in result['texts']]
+        return relative_path, epaper, pages
+
+    def upload(self, field, instance, filename, path):
+        with open(path, 'rb') as local_file:
+            return field.storage.save(field.generate_filename(instance, filename), File(local_file))
+
+    def flush(self, batch, ledger, started):
+        epapers = [epaper for _, epaper, _ in batch]
+        with transaction.atomic():
+            Epaper.objects.bulk_create(epapers)
+            ShortURL.bulk_create_for(epapers)
+            EpaperPage.objects.bulk_create(
+                [page for _, _, pages in batch for page in pages], batch_size=500
+            )
+        invalidate_archive_index()
+
+        ledger.record(
+            {'path': relative_path, 'epaper_id': str(epaper.id), 'pages': epaper.page_count}
+            for relative_path, epaper, _ in batch
+        )
+
+        self.loaded += len(batch)
+        self.pages += sum(epaper.page_count for epaper in epapers)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"✓ {self.loaded} e-paper(s), {self.pages} pages ({self.pages / elapsed:.2f} pages/s)"
+        )
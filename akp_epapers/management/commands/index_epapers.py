@@ -0,0 +1,33 @@
+"""
+Management command to queue text extraction for e-papers uploaded before
+pages were indexed for search
+"""
+from django.core.management.base import BaseCommand
+
+from akp_epapers.models import Epaper
+from akp_media.jobs import enqueue_job
+
+
+class Command(BaseCommand):
+    help = 'Queue text extraction for every e-paper that has no indexed pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Re-extract every e-paper, not only those without pages',
+        )
+
+    def handle(self, *args, **options):
+        epapers = Epaper.objects.exclude(file__isnull=True).exclude(file='')
+        if not options['all']:
+            epapers = epapers.filter(pages__isnull=True)
+
+        total = 0
+        for epaper in epapers.only('id', 'file').iterator():
+            enqueue_job('epapers.extract_text', epaper, source=epaper.file.name)
+            total += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Queued {total} e-paper(s); run_media_worker will index them')
+        )
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('akp_epapers', '0008_alter_shorturl_short_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='epaper',
+            name='page_count',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='epaper',
+            name='pages_manifest',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('akp_epapers', '0009_epaper_page_images'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='epaper',
+            name='file_size',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='epaper',
+            name='original_file',
+            field=models.FileField(blank=True, editable=False, null=True, upload_to='akp_epapers/pdfs/'),
+        ),
+        migrations.AddField(
+            model_name='epaper',
+            name='original_size',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('akp_epapers', '0010_epaper_original_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EpaperPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('number', models.PositiveIntegerField()),
+                ('text', models.TextField(blank=True, default='')),
+                ('words', models.JSONField(blank=True, default=list)),
+            ],
+            options={
+                'verbose_name_plural': 'E-Paper Pages',
+                'ordering': ['epaper', 'number'],
+            },
+        ),
+        migrations.AddField(
+            model_name='epaper',
+            name='edition',
+            field=models.CharField(blank=True, default='', help_text='e.g. Delhi, Lucknow', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='epaper',
+            index=models.Index(fields=['timestamp', 'edition'], name='epaper_timestamp_edition'),
+        ),
+        migrations.AddField(
+            model_name='epaperpage',
+            name='epaper',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pages', to='akp_epapers.epaper'),
+        ),
+        migrations.AddConstraint(
+            model_name='epaperpage',
+            constraint=models.UniqueConstraint(fields=('epaper', 'number'), name='unique_epaper_page'),
+        ),
+    ]
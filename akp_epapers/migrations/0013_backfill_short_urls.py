@@ -0,0 +1,54 @@
+import string
+
+from django.db import migrations
+
+# A frozen copy of akp_epapers.models.encode_short_code: migrations must not
+# depend on code that may change after they were written.
+SHORT_CODE_ALPHABET = string.digits + string.ascii_letters
+SHORT_CODE_LENGTH = 5
+SHORT_CODE_SPACE = len(SHORT_CODE_ALPHABET) ** SHORT_CODE_LENGTH
+SHORT_CODE_MULTIPLIER = 387_420_489
+SHORT_CODE_OFFSET = 104_729
+
+
+def encode_short_code(number):
+    if number < SHORT_CODE_SPACE:
+        value = (number * SHORT_CODE_MULTIPLIER + SHORT_CODE_OFFSET) % SHORT_CODE_SPACE
+        width = SHORT_CODE_LENGTH
+    else:
+        value = number - SHORT_CODE_SPACE + len(SHORT_CODE_ALPHABET) ** 6
+        width = 0
+
+    base = len(SHORT_CODE_ALPHABET)
+    code = ''
+    while value or len(code) < width:
+        value, digit = divmod(value, base)
+        code = SHORT_CODE_ALPHABET[digit] + code
+    return code
+
+
+# Short URLs used to be created lazily on the first page view; e-papers that
+# were never viewed get theirs now that they are only created with the row.
+def create_missing_short_urls(apps, schema_editor):
+    Epaper = apps.get_model('akp_epapers', 'Epaper')
+    ShortURL = apps.get_model('akp_epapers', 'ShortURL')
+
+    for epaper in Epaper.objects.filter(short_url__isnull=True).iterator():
+        short_url = ShortURL.objects.create(epaper=epaper)
+        short_url.short_url = encode_short_code(short_url.pk)
+        short_url.save(update_fields=['short_url'])
+
+    for short_url in ShortURL.objects.filter(short_url__isnull=True).iterator():
+        short_url.short_url = encode_short_code(short_url.pk)
+        short_url.save(update_fields=['short_url'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('akp_epapers', '0012_epaper_page_fts'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_short_urls, migrations.RunPython.noop),
+    ]
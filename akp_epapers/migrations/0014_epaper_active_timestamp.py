@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('akp_epapers', '0013_backfill_short_urls'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='epaper',
+            index=models.Index(fields=['timestamp', 'created_at'], condition=models.Q(is_active=True), name='epaper_active_timestamp'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+PAGE_TABLE = 'akp_epapers_epaperpage'
+
+CREATE_SQL = [
+    f"""ALTER TABLE {PAGE_TABLE} ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('simple', text)) STORED""",
+    f"CREATE INDEX epaperpage_search_vector_gin ON {PAGE_TABLE} USING gin (search_vector)",
+]
+
+DROP_SQL = [
+    "DROP INDEX IF EXISTS epaperpage_search_vector_gin",
+    f"ALTER TABLE {PAGE_TABLE} DROP COLUMN IF EXISTS search_vector",
+]
+
+
+# The PostgreSQL counterpart of the FTS5 table in 0012: a tsvector column
+# Postgres computes from the page text, behind a GIN index. The 'simple'
+# configuration lower-cases words without stemming, which suits Hindi.
+def create_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in CREATE_SQL:
+            schema_editor.execute(statement)
+
+
+def drop_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in DROP_SQL:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('akp_epapers', '0014_epaper_active_timestamp'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_vector, drop_search_vector),
+    ]
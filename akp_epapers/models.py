@@ -1,26 +1,69 @@
 from django.db import models
-from Base.base import HomeBaseModel
+from Base.base import DirtyFieldsMixin, HomeBaseModel
 from akp_accounts.models import CustomUser
 from akp_news.base import BaseModel
 
-import pymupdf  # PyMuPDF for PDF manipulation
-from django.core.files.base import ContentFile
-from io import BytesIO
-from PIL import Image, ImageOps
+from akp_media.jobs import enqueue_job
+
+import functools
+import hashlib
+import json
 import string
-import random
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from django.urls import reverse
 # Create your models here.
 
-
-class Epaper(HomeBaseModel):
+SHORT_CODE_ALPHABET = string.digits + string.ascii_letters
+SHORT_CODE_LENGTH = 5
+SHORT_CODE_SPACE = len(SHORT_CODE_ALPHABET) ** SHORT_CODE_LENGTH
+# Coprime with 62 (odd, not a multiple of 31), so multiplying by it modulo
+# SHORT_CODE_SPACE is a bijection that scatters consecutive ids.
+SHORT_CODE_MULTIPLIER = 387_420_489
+SHORT_CODE_OFFSET = 104_729
+
+
+def encode_short_code(number):
+    """
+    Collision-free short code for a ShortURL id. The first 62**5 ids get
+    shuffled 5-character codes; later ids get 7+ characters. Neither can clash
+    with the 6-character random codes issued before.
+    """
+    if number < SHORT_CODE_SPACE:
+        value = (number * SHORT_CODE_MULTIPLIER + SHORT_CODE_OFFSET) % SHORT_CODE_SPACE
+        width = SHORT_CODE_LENGTH
+    else:
+        value = number - SHORT_CODE_SPACE + len(SHORT_CODE_ALPHABET) ** 6
+        width = 0
+
+    base = len(SHORT_CODE_ALPHABET)
+    code = ''
+    while value or len(code) < width:
+        value, digit = divmod(value, base)
+        code = SHORT_CODE_ALPHABET[digit] + code
+    return code
+
+
+class Epaper(DirtyFieldsMixin, HomeBaseModel):
     file = models.FileField(upload_to='akp_epapers/pdfs/', null=True, blank=True)
+    # The upload as received; ``file`` is replaced by the optimised copy.
+    original_file = models.FileField(upload_to='akp_epapers/pdfs/', null=True, blank=True, editable=False)
+    original_size = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    file_size = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
     is_active = models.BooleanField(default=True)
     timestamp = models.DateField(null=True, blank=True)
+    edition = models.CharField(max_length=100, blank=True, default='', help_text="e.g. Delhi, Lucknow")
+    page_count = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    pages_manifest = models.JSONField(null=True, blank=True, editable=False)
 
     class Meta:
         verbose_name_plural = "E-Papers"
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['timestamp', 'edition'], name='epaper_timestamp_edition'),
+            models.Index(fields=['timestamp', 'created_at'], condition=models.Q(is_active=True), name='epaper_active_timestamp'),
+        ]
     
     def __str__(self):
         return self.meta_title
@@ -31,131 +74,65 @@ class Epaper(HomeBaseModel):
         except Exception as e:
             return None
 
-    def save(self, *args, **kwargs):
+    def get_page_images(self):
         """
-        Overrides the save method to extract PDF metadata and a cropped thumbnail image,
-        populating the fields inherited from HomeBaseModel.
+        The page manifest with storage names resolved to URLs, or None until
+        the pages of the current file have been rendered.
+
+        On R2 every URL is a signature, so the resolved manifest is cached in
+        the shared cache and its URLs are signed for twice as long as the
+        cache keeps them: every view gets the same URLs (which browsers can
+        cache) and they stay valid for at least EPAPER_PAGE_URL_CACHE_TIMEOUT.
         """
+        manifest = self.pages_manifest
+        if not manifest or not self.file or manifest.get('source') != self.file.name:
+            return None
 
-        if not hasattr(self, 'short_url') or not self.short_url.short_url:
-            # Generate a short URL if it doesn't exist and assign it to self.short_url
-            short_url_obj, created = ShortURL.objects.get_or_create(epaper=self)
-            self.short_url = short_url_obj
+        # Keyed by the manifest itself, so a re-render is picked up at once.
+        digest = hashlib.sha1(json.dumps(manifest, sort_keys=True).encode()).hexdigest()
+        key = f'epaper-pages:{self.id}:{digest}'
+        resolved = cache.get(key)
+        if resolved is not None:
+            return resolved
+
+        storage = self.file.storage
+        timeout = settings.EPAPER_PAGE_URL_CACHE_TIMEOUT
+        if hasattr(storage, 'bucket'):
+            url = functools.partial(storage.url, expire=2 * timeout)
+        else:
+            url = storage.url
+        pages = []
+        for page in manifest['pages']:
+            page = dict(page, images={width: url(name) for width, name in page['images'].items()})
+            if 'tiles' in page:
+                page['tiles'] = dict(page['tiles'], names=[url(name) for name in page['tiles']['names']])
+            pages.append(page)
+        resolved = {'widths': manifest['widths'], 'pages': pages}
+        cache.set(key, resolved, timeout)
+        return resolved
+
+    def save(self, *args, **kwargs):
+        """
+        Overrides the save method to queue PDF processing. The cropped thumbnail
+        for meta_image and the page images for the viewer are rendered by
+        run_media_worker once the row is saved. The short URL is created by the
+        post_save signal.
+        """
 
         # Check if the file is new or has been changed to avoid reprocessing
-        process_pdf = True
-        if not self._state.adding: # if this is an existing object
-            try:
-                old_instance = Epaper.objects.get(pk=self.pk)
-                if old_instance.file == self.file:
-                    process_pdf = False # Don't re-process if the file is the same
-            except Epaper.DoesNotExist:
-                pass # Should not happen, but good to handle
+        process_pdf = self.has_changed('file')
 
-        if process_pdf and self.file:
-            try:
-                # Store original file position
-                original_position = self.file.tell()
-                
-                # Read the file content for processing
-                self.file.seek(0)
-                pdf_file_stream = self.file.read()
-                
-                # Reset file position immediately after reading
-                self.file.seek(original_position)
-                
-                # Open PDF document from the stream
-                pdf_document = pymupdf.open(stream=pdf_file_stream, filetype="pdf")
-
-                # --- 1. Extract Metadata ---
-                metadata = pdf_document.metadata
-                # 'subject' is the standard PDF metadata field for a description
-
-                # If description is still missing, extract text from the first page as a fallback
-                if not self.meta_description and pdf_document.page_count > 0:
-                    first_page = pdf_document.load_page(0)
-                    # Get the first 40 words for a concise description
-                    # self.meta_description = " ".join(first_page.get_text("text").split()[:40]) + "..."
-
-                # --- 2. Extract and Crop Thumbnail ---
-                if pdf_document.page_count > 0:
-                    first_page = pdf_document.load_page(0)
-
-                    # Set zoom factor to get high quality image
-                    zoom_factor = 4.0
-                    matrix = pymupdf.Matrix(zoom_factor, zoom_factor)
-                    pix = first_page.get_pixmap(matrix=matrix)
-                    
-                    # Convert pixmap to PIL Image for cropping
-                    img_data = pix.tobytes("png")
-                    img_buffer = BytesIO(img_data)
-                    pil_image = Image.open(img_buffer)
-                    
-                    # Define target dimensions
-                    target_width = 800
-                    target_height = 450
-                    target_ratio = target_width / target_height
-                    
-                    # Get current image dimensions
-                    current_width, current_height = pil_image.size
-                    current_ratio = current_width / current_height
-                    
-                    # Determine how to crop based on aspect ratios
-                    if current_ratio > target_ratio:
-                        # Image is wider than target - crop horizontally
-                        # Calculate new width to match target ratio
-                        new_width = int(current_height * target_ratio)
-                        left = (current_width - new_width) // 2
-                        top = 0
-                        right = left + new_width
-                        bottom = current_height
-                    else:
-                        # Image is taller than target - crop vertically (half cut from top)
-                        # Calculate new height to match target ratio
-                        new_height = int(current_width / target_ratio)
-                        left = 0
-                        # Crop from the top half of the image
-                        top = 0
-                        right = current_width
-                        bottom = min(new_height, current_height)
-                    
-                    # Crop the image
-                    cropped_image = pil_image.crop((left, top, right, bottom))
-                    
-                    # Resize to exact target dimensions
-                    final_image = cropped_image.resize((target_width, target_height), Image.LANCZOS)
-                    
-                    # Optional: Apply some image enhancement
-                    final_image = ImageOps.exif_transpose(final_image)  # Fix rotation if needed
-                    
-                    # Save the final image to buffer
-                    final_buffer = BytesIO()
-                    final_image.save(final_buffer, format='PNG', quality=95, optimize=True)
-                    final_buffer.seek(0)
-                    
-                    # Generate unique image name
-                    # base_name = os.path.splitext(self.file.name)[0]
-                    image_name = f"meta_{self.id}.png"
-                    
-                    # Create ContentFile and assign to meta_image
-                    self.meta_image = ContentFile(final_buffer.read(), name=image_name)
-                    
-                    # Clean up buffers
-                    img_buffer.close()
-                    final_buffer.close()
-
-                pdf_document.close()
-
-            except Exception as e:
-                # Handle potential errors with corrupted PDFs or other issues
-                print(f"Error processing PDF for metadata: {e}")
-                # Ensure there's a default title if extraction fails
-                if not self.meta_title:
-                    self.meta_title = str(self.file.name).split('/')[-1]
+        # Ensure there's a default title until the worker has processed the PDF
+        if self.file and not self.meta_title:
+            self.meta_title = str(self.file.name).split('/')[-1]
 
         # Call the original save method from the parent class
         super().save(*args, **kwargs)
 
+        if process_pdf and self.file:
+            # Page images are queued by this job once the PDF is linearised.
+            enqueue_job('epapers.process_pdf', self, source=self.file.name)
+
 
 class ShortURL(models.Model):
     epaper = models.OneToOneField(Epaper, on_delete=models.CASCADE, related_name='short_url')
@@ -173,17 +150,46 @@ class ShortURL(models.Model):
         return f"{self.epaper} - {self.short_url}"
     
     def save(self, *args, **kwargs):
-        if not self.short_url:
-            self.short_url = self.generate_short_url()
-        super().save(*args, **kwargs)
-    
-    @staticmethod
-    def generate_short_url(length=6):
-        characters = string.ascii_letters + string.digits
-        while True:
-            code = ''.join(random.choice(characters) for _ in range(length))
-            if not ShortURL.objects.filter(short_url=code).exists():
-                return code
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if not self.short_url:
+                # The code is derived from the row id, so it is set after the insert.
+                self.short_url = encode_short_code(self.pk)
+                ShortURL.objects.filter(pk=self.pk).update(short_url=self.short_url)
+
+    @classmethod
+    def bulk_create_for(cls, epapers):
+        """
+        Create the short URLs for already-inserted e-papers in two queries.
+        """
+        short_urls = cls.objects.bulk_create([cls(epaper=epaper) for epaper in epapers])
+        if any(short_url.pk is None for short_url in short_urls):
+            # Backends that don't return ids from bulk inserts
+            short_urls = list(cls.objects.filter(epaper__in=epapers))
+        for short_url in short_urls:
+            short_url.short_url = encode_short_code(short_url.pk)
+        cls.objects.bulk_update(short_urls, ['short_url'], batch_size=500)
+        return short_urls
+
+class EpaperPage(BaseModel):
+    """
+    Extracted text of one e-paper page. ``words`` holds ``[x0, y0, x1, y1, word]``
+    boxes as fractions of the page size, for highlighting search hits.
+    """
+    epaper = models.ForeignKey(Epaper, on_delete=models.CASCADE, related_name='pages')
+    number = models.PositiveIntegerField()
+    text = models.TextField(blank=True, default='')
+    words = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        verbose_name_plural = "E-Paper Pages"
+        ordering = ['epaper', 'number']
+        constraints = [
+            models.UniqueConstraint(fields=['epaper', 'number'], name='unique_epaper_page'),
+        ]
+
+    def __str__(self):
+        return f"{self.epaper} - page {self.number}"
 
 class EpaperDownload(BaseModel):
     epaper = models.ForeignKey(Epaper, on_delete=models.CASCADE, related_name='downloads')
@@ -0,0 +1,81 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import EpaperPage
+
+FTS_TABLE = 'akp_epapers_epaperpage_fts'
+# Must match the configuration of the search_vector column (migration 0015).
+SEARCH_CONFIG = 'simple'
+
+# Python's \w splits Devanagari at its vowel signs, so words are delimited
+# by whitespace and punctuation instead.
+WORD_SEPARATORS = re.compile(r"[\s.,;:!?\"'()\[\]{}<>/\\|।॥“”‘’–—-]+")
+
+
+def query_terms(query):
+    return [term for term in WORD_SEPARATORS.split(query.casefold()) if term]
+
+
+def search_pages(query, date=None, edition=None):
+    """
+    E-paper pages containing every word of ``query``, optionally limited to
+    one publication date and edition, newest first.
+
+    Answered from the full-text index over EpaperPage.text: the FTS5 table
+    on SQLite, the GIN-indexed search_vector column on PostgreSQL. Other
+    databases narrow by date/edition and fall back to icontains.
+    """
+    terms = query_terms(query or '')
+    if not terms:
+        return EpaperPage.objects.none()
+
+    pages = EpaperPage.objects.filter(epaper__is_active=True).select_related('epaper')
+    if date:
+        pages = pages.filter(epaper__timestamp=date)
+    if edition:
+        pages = pages.filter(epaper__edition__iexact=edition)
+
+    if connection.vendor == 'sqlite':
+        match = ' '.join('"%s"' % term.replace('"', '""') for term in terms)
+        pages = pages.filter(
+            id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        )
+    elif connection.vendor == 'postgresql':
+        # Needs psycopg, so only imported where it is installed.
+        from django.contrib.postgres.search import SearchQuery, SearchVectorField
+
+        search_vector = RawSQL(f'"{EpaperPage._meta.db_table}"."search_vector"', [], output_field=SearchVectorField())
+        pages = pages.annotate(search_vector=search_vector).filter(
+            search_vector=SearchQuery(' '.join(terms), config=SEARCH_CONFIG)
+        )
+    else:
+        for term in terms:
+            pages = pages.filter(text__icontains=term)
+
+    return pages.order_by('-epaper__timestamp', 'epaper_id', 'number')
+
+
+def page_hits(words, terms):
+    """
+    Boxes (as page fractions) of the words on a page that match ``terms``.
+    """
+    terms = set(terms)
+    return [
+        [x0, y0, x1, y1]
+        for x0, y0, x1, y1, word in words
+        if WORD_SEPARATORS.sub('', word).casefold() in terms
+    ]
+
+
+def page_snippet(text, terms, radius=60):
+    text = ' '.join(text.split())
+    lowered = text.casefold()
+    positions = [index for index in (lowered.find(term) for term in terms) if index != -1]
+    if not positions:
+        return text[:radius * 2]
+
+    start = max(0, min(positions) - radius)
+    end = min(len(text), min(positions) + radius)
+    return ('...' if start else '') + text[start:end] + ('...' if end < len(text) else '')
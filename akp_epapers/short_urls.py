@@ -0,0 +1,41 @@
+"""
+Short URL resolution for ``/s/<code>/``.
+
+A code never changes the e-paper it points at, so its target is cached in
+a per-worker LRU in front of the shared cache, and steady-state redirects
+don't touch the database. Unknown codes are not cached.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+
+from .models import ShortURL
+
+
+def cache_key(code):
+    return f'short_url:{code}'
+
+
+@lru_cache(maxsize=getattr(settings, 'SHORT_URL_LRU_SIZE', 10000))
+def resolve_short_url(code):
+    """
+    The e-paper URL for ``code``; raises ShortURL.DoesNotExist (which
+    lru_cache does not remember) for unknown codes.
+    """
+    url = cache.get(cache_key(code))
+    if url is None:
+        epaper_id = ShortURL.objects.filter(short_url=code).values_list('epaper_id', flat=True).first()
+        if epaper_id is None:
+            raise ShortURL.DoesNotExist(code)
+        url = reverse('view_epaper', kwargs={'epaper_id': epaper_id})
+        cache.set(cache_key(code), url, getattr(settings, 'SHORT_URL_CACHE_TIMEOUT', 60 * 60 * 24 * 30))
+    return url
+
+
+def forget_short_url(code):
+    # Other workers keep their LRU entry until restart; the target page
+    # itself 404s once the e-paper is gone.
+    cache.delete(cache_key(code))
+    resolve_short_url.cache_clear()
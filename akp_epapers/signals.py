@@ -1,20 +1,33 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
+from .archive import invalidate_archive_index
 from .models import Epaper, ShortURL
+from .short_urls import forget_short_url
 
 @receiver(post_save, sender=Epaper)
 def create_short_url_for_epaper(sender, instance, created, **kwargs):
     """
-    This signal is triggered automatically every time an Epaper instance is saved.
-    It creates a corresponding ShortURL object.
+    Give every new Epaper its ShortURL, once, when the row is created.
+    Bulk inserts don't send post_save and use ShortURL.bulk_create_for.
     """
-    if created and not hasattr(instance, 'short_url'):
-        try:
+    if created and not kwargs.get('raw'):
+        ShortURL.objects.create(epaper=instance)
 
-            # Create the ShortURL object, which automatically generates a short_code
-            ShortURL.objects.create(
-                epaper=instance
-            )
-            print(f"Short URL created for newly saved Epaper: {instance.meta_title}")
-        except Exception as e:
-            print(f"---! ERROR creating Short URL for Epaper ID {instance.id} !---: {e}")
\ No newline at end of file
+@receiver(pre_save, sender=ShortURL)
+def forget_changed_short_url(sender, instance, **kwargs):
+    # A code edited in the admin must stop resolving under its old value.
+    if instance.pk:
+        previous = ShortURL.objects.filter(pk=instance.pk).values_list('short_url', flat=True).first()
+        if previous and previous != instance.short_url:
+            forget_short_url(previous)
+
+@receiver(post_delete, sender=ShortURL)
+def forget_deleted_short_url(sender, instance, **kwargs):
+    if instance.short_url:
+        forget_short_url(instance.short_url)
+
+@receiver(post_save, sender=Epaper)
+@receiver(post_delete, sender=Epaper)
+@receiver(post_save, sender=ShortURL)
+def drop_archive_index(sender, **kwargs):
+    invalidate_archive_index()
@@ -0,0 +1,207 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import repeat
+
+import pymupdf  # PyMuPDF for PDF manipulation
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+from akp_media.jobs import enqueue_job, register_task
+from akp_media.processing import save_derivative, commit_if_unchanged
+from .archive import invalidate_archive_index
+from .models import Epaper, EpaperPage
+from .utils import extract_page_text, generate_thumbnail, manifest_files, render_page_images, web_pdf
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def local_pdf_copy(epaper):
+    """
+    Yield the path of a temporary local copy of the e-paper PDF, for worker
+    processes that open it by path instead of receiving it pickled.
+    """
+    with tempfile.NamedTemporaryFile(suffix='.pdf') as pdf_file:
+        with epaper.file.open('rb') as source:
+            shutil.copyfileobj(source, pdf_file)
+        pdf_file.flush()
+        yield pdf_file.name
+
+
+def render_pool(page_count):
+    workers = min(page_count, settings.EPAPER_RENDER_PROCESSES or os.cpu_count() or 1)
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+def pdf_options():
+    return {
+        'optimize': settings.EPAPER_PDF_OPTIMIZE,
+        'image_dpi': settings.EPAPER_PDF_IMAGE_DPI,
+        'dpi_threshold': settings.EPAPER_PDF_IMAGE_DPI_THRESHOLD,
+        'image_quality': settings.EPAPER_PDF_IMAGE_QUALITY,
+    }
+
+
+def served_pdf_name(epaper, source):
+    # Name it after the e-paper so it can never overwrite another upload.
+    stem = os.path.splitext(os.path.basename(source))[0]
+    return f"{stem}-{str(epaper.id)[:8]}.pdf"
+
+
+def pages_folder(epaper, source):
+    # A fresh folder per upload keeps page URLs immutable and cacheable.
+    return f"akp_epapers/pages/{epaper.id}/{hashlib.sha1(source.encode()).hexdigest()[:12]}"
+
+
+@register_task('epapers.process_pdf')
+def process_epaper_pdf(epaper, job):
+    """
+    Render the thumbnail for an uploaded e-paper, optimise the PDF (when
+    EPAPER_PDF_OPTIMIZE is on) and linearise it for fast web view, swap the
+    results onto the row, then queue the page renditions for the final file.
+    The uploaded PDF is kept as original_file when a different file is
+    served; the previous upload's original and served PDF are deleted.
+    """
+    if not epaper.file or epaper.file.name != job.source:
+        return
+
+    with epaper.file.open('rb') as pdf_file:
+        pdf_file_stream = pdf_file.read()
+
+    pdf_document = pymupdf.open(stream=pdf_file_stream, filetype="pdf")
+    try:
+        thumbnail = generate_thumbnail(pdf_document, f"meta_{epaper.id}.webp")
+    finally:
+        pdf_document.close()
+
+    if thumbnail is None:
+        return
+
+    served = web_pdf(pdf_file_stream, **pdf_options())
+
+    values = {
+        'meta_image': save_derivative(epaper, 'meta_image', thumbnail),
+        'original_size': len(pdf_file_stream),
+        'file_size': len(served),
+    }
+    if served is not pdf_file_stream:
+        values['file'] = save_derivative(epaper, 'file', ContentFile(served, name=served_pdf_name(epaper, job.source)))
+        values['original_file'] = job.source
+    else:
+        # The upload is served as it is; don't keep a second name for it.
+        values['original_file'] = None
+
+    # The files of the previous upload: its original and the PDF served for it.
+    superseded = {epaper.original_file.name, (epaper.pages_manifest or {}).get('source')}
+
+    if not commit_if_unchanged(epaper, 'file', job.source, **values):
+        epaper.meta_image.storage.delete(values['meta_image'])
+        if 'file' in values:
+            epaper.file.storage.delete(values['file'])
+        return
+
+    for name in superseded - {None, '', job.source, values.get('file')}:
+        epaper.file.storage.delete(name)
+
+    # The thumbnail was swapped in with an update(), which sends no signal.
+    invalidate_archive_index()
+    if 'file' in values:
+        logger.info(
+            f"E-paper {epaper.id}: {values['original_size']} -> {values['file_size']} bytes "
+            f"({100 - 100 * values['file_size'] // values['original_size']}% smaller)"
+        )
+    source = values.get('file', job.source)
+    enqueue_job('epapers.render_pages', epaper, source=source)
+    enqueue_job('epapers.extract_text', epaper, source=source)
+
+
+@register_task('epapers.render_pages')
+def render_epaper_pages(epaper, job):
+    """
+    Render every page of an uploaded e-paper to WebP at each of
+    EPAPER_PAGE_WIDTHS and store the page manifest the viewer reads.
+
+    Pages are rendered in parallel on a process pool and uploaded from a
+    thread pool while the remaining pages are still rendering.
+    """
+    if not epaper.file or epaper.file.name != job.source:
+        return
+
+    storage = epaper.file.storage
+    folder = pages_folder(epaper, job.source)
+    widths = tuple(settings.EPAPER_PAGE_WIDTHS)
+
+    with local_pdf_copy(epaper) as pdf_path:
+        with pymupdf.open(pdf_path) as document:
+            page_count = document.page_count
+        if page_count == 0:
+            return
+
+        pages = []
+        stored = []
+        with render_pool(page_count) as pool, ThreadPoolExecutor(max_workers=8) as uploads:
+            rendered = pool.map(
+                render_page_images,
+                repeat(pdf_path),
+                range(page_count),
+                repeat(widths),
+                repeat(settings.EPAPER_PAGE_TILE_SIZE),
+                repeat(settings.EPAPER_PAGE_QUALITY),
+            )
+            try:
+                for entry, files in rendered:
+                    names = dict(zip(
+                        (name for name, _ in files),
+                        uploads.map(lambda item: storage.save(f"{folder}/{item[0]}", ContentFile(item[1])), files),
+                    ))
+                    stored.extend(names.values())
+                    entry['images'] = {width: names[name] for width, name in entry['images'].items()}
+                    if 'tiles' in entry:
+                        entry['tiles']['names'] = [names[name] for name in entry['tiles']['names']]
+                    pages.append(entry)
+            except BaseException:
+                for name in stored:
+                    storage.delete(name)
+                raise
+
+    manifest = {'source': job.source, 'widths': sorted(widths), 'pages': pages}
+    previous = epaper.pages_manifest
+    if commit_if_unchanged(epaper, 'file', job.source, pages_manifest=manifest, page_count=page_count):
+        stale = set(manifest_files(previous)) - set(stored)
+    else:
+        stale = stored
+    for name in stale:
+        storage.delete(name)
+
+
+@register_task('epapers.extract_text')
+def extract_epaper_text(epaper, job):
+    """
+    Extract the text and word boxes of every page into EpaperPage rows, which
+    the e-paper search reads instead of reopening PDFs. Pages are extracted
+    in parallel on a process pool.
+    """
+    if not epaper.file or epaper.file.name != job.source:
+        return
+
+    with local_pdf_copy(epaper) as pdf_path:
+        with pymupdf.open(pdf_path) as document:
+            page_count = document.page_count
+        with render_pool(max(page_count, 1)) as pool:
+            pages = [
+                EpaperPage(epaper=epaper, **page)
+                for page in pool.map(extract_page_text, repeat(pdf_path), range(page_count))
+            ]
+
+    with transaction.atomic():
+        # Lock the row so a newer upload can't slip in between the check and the swap.
+        if not Epaper.objects.select_for_update().filter(pk=epaper.pk, file=job.source).exists():
+            return
+        EpaperPage.objects.filter(epaper=epaper).delete()
+        EpaperPage.objects.bulk_create(pages)
@@ -1,3 +1,60 @@
+import datetime
+
+from django.db import connection
 from django.test import TestCase
 
-# Create your tests here.
+from .models import Epaper, EpaperPage
+from .search import search_pages
+
+
+class SearchPagesTests(TestCase):
+    """
+    Runs against whichever database the settings use: the FTS5 index on
+    SQLite, the GIN-indexed search_vector on PostgreSQL.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.delhi = Epaper.objects.create(meta_title='Delhi', timestamp=datetime.date(2026, 10, 2), edition='Delhi')
+        cls.lucknow = Epaper.objects.create(meta_title='Lucknow', timestamp=datetime.date(2026, 10, 1), edition='Lucknow')
+        cls.hidden = Epaper.objects.create(meta_title='Hidden', timestamp=datetime.date(2026, 10, 3), is_active=False)
+        EpaperPage.objects.create(epaper=cls.delhi, number=1, text='नई दिल्ली में आज का प्रहरी समाचार')
+        EpaperPage.objects.create(epaper=cls.delhi, number=2, text='Cricket: India wins the series')
+        EpaperPage.objects.create(epaper=cls.lucknow, number=3, text='लखनऊ समाचार, प्रहरी विशेष')
+        EpaperPage.objects.create(epaper=cls.hidden, number=1, text='प्रहरी समाचार')
+
+    def search(self, query, **filters):
+        return [(page.epaper.meta_title, page.number) for page in search_pages(query, **filters)]
+
+    def test_pages_with_every_word_newest_first(self):
+        self.assertEqual(self.search('प्रहरी समाचार'), [('Delhi', 1), ('Lucknow', 3)])
+        self.assertEqual(self.search('समाचार दिल्ली'), [('Delhi', 1)])
+        self.assertEqual(self.search('INDIA, series!'), [('Delhi', 2)])
+        self.assertEqual(self.search('प्रहरी क्रिकेट'), [])
+        self.assertEqual(self.search('  '), [])
+
+    def test_date_and_edition(self):
+        self.assertEqual(self.search('समाचार', date=datetime.date(2026, 10, 1)), [('Lucknow', 3)])
+        self.assertEqual(self.search('समाचार', edition='delhi'), [('Delhi', 1)])
+
+    def test_index_follows_text_changes(self):
+        EpaperPage.objects.filter(epaper=self.delhi, number=2).update(text='Hockey: India draws')
+        self.assertEqual(self.search('series'), [])
+        self.assertEqual(self.search('hockey'), [('Delhi', 2)])
+        EpaperPage.objects.filter(epaper=self.delhi, number=2).delete()
+        self.assertEqual(self.search('hockey'), [])
+
+    def test_answered_from_the_index(self):
+        pages = search_pages('प्रहरी समाचार')
+        if connection.vendor == 'sqlite':
+            self.assertIn('akp_epapers_epaperpage_fts MATCH', str(pages.query))
+        elif connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # The tables are tiny; make the planner show it can use the index.
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                sql, params = pages.query.sql_with_params()
+                cursor.execute(f'EXPLAIN {sql}', params)
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+            self.assertIn('epaperpage_search_vector_gin', plan)
+        else:
+            self.assertIn('LIKE', str(pages.query).upper())
@@ -0,0 +1,213 @@
+import math
+from io import BytesIO
+
+import pikepdf
+import pymupdf  # PyMuPDF for PDF manipulation
+from django.core.files.base import ContentFile
+from PIL import Image
+
+
+def pixmap_to_webp(pix, quality=80):
+    # Hand the raw samples to PIL; no PNG encode/decode in between.
+    mode = 'RGB' if pix.n == 3 else 'L'
+    image = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+    buffer = BytesIO()
+    image.save(buffer, format='WEBP', quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def thumbnail_clip(page_rect, target_ratio):
+    """
+    The region of the page that ends up in the thumbnail: a horizontally
+    centred band for pages wider than the target ratio, otherwise the top band.
+    """
+    page_ratio = page_rect.width / page_rect.height
+    if page_ratio > target_ratio:
+        clip_width = page_rect.height * target_ratio
+        left = page_rect.x0 + (page_rect.width - clip_width) / 2
+        return pymupdf.Rect(left, page_rect.y0, left + clip_width, page_rect.y1)
+
+    clip_height = page_rect.width / target_ratio
+    return pymupdf.Rect(page_rect.x0, page_rect.y0, page_rect.x1, page_rect.y0 + clip_height)
+
+
+def generate_thumbnail(pdf_document, image_name, width=800, height=450, quality=80):
+    """
+    Render the top 16:9 band of the first page as an 800x450 WebP thumbnail.
+    Returns a ContentFile, or None for an empty document.
+
+    Only the clipped region is rasterised, at exactly the scale the thumbnail
+    needs, so a broadsheet page never has to be rendered in full.
+    """
+    if pdf_document.page_count == 0:
+        return None
+
+    first_page = pdf_document.load_page(0)
+
+    clip = thumbnail_clip(first_page.rect, width / height)
+    zoom = width / clip.width
+    pix = first_page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), clip=clip, alpha=False)
+
+    mode = 'RGB' if pix.n == 3 else 'L'
+    image = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+    if image.size != (width, height):
+        # Rounding of the clip can leave us a pixel off.
+        image = image.resize((width, height), Image.Resampling.LANCZOS)
+
+    buffer = BytesIO()
+    image.save(buffer, format='WEBP', quality=quality, method=4)
+
+    return ContentFile(buffer.getvalue(), name=image_name)
+
+
+def image_rewrite_options(image_dpi, dpi_threshold, image_quality):
+    """
+    MuPDF image rewriter options that resample colour and grey images with
+    bicubic filtering. ``Document.rewrite_images``' own options subsample by
+    whole factors only, which leaves a 280 DPI scan untouched at a 150 target.
+    Photos are re-encoded as JPEG; lossless images (logos, line art) stay
+    lossless.
+    """
+    mupdf = pymupdf.mupdf
+    options = mupdf.PdfImageRewriterOptions()
+    for kind, method in (
+        ('color_lossy', mupdf.FZ_RECOMPRESS_JPEG),
+        ('gray_lossy', mupdf.FZ_RECOMPRESS_JPEG),
+        ('color_lossless', mupdf.FZ_RECOMPRESS_LOSSLESS),
+        ('gray_lossless', mupdf.FZ_RECOMPRESS_LOSSLESS),
+    ):
+        setattr(options, f"{kind}_image_recompress_method", method)
+        setattr(options, f"{kind}_image_recompress_quality", str(image_quality))
+        setattr(options, f"{kind}_image_subsample_method", mupdf.FZ_SUBSAMPLE_BICUBIC)
+        setattr(options, f"{kind}_image_subsample_threshold", dpi_threshold)
+        setattr(options, f"{kind}_image_subsample_to", image_dpi)
+    return options
+
+
+def optimize_pdf(data, image_dpi=150, dpi_threshold=200, image_quality=75):
+    """
+    Shrink a PDF as it comes from the print desk: downsample embedded images
+    above ``dpi_threshold`` to ``image_dpi``, drop unused objects and deflate
+    every stream. Returns the new bytes, or None if nothing was saved.
+    """
+    with pymupdf.open(stream=data, filetype="pdf") as document:
+        if image_dpi:
+            document.rewrite_images(options=image_rewrite_options(image_dpi, dpi_threshold, image_quality))
+        optimized = document.tobytes(
+            garbage=4,
+            deflate=True,
+            deflate_images=True,
+            deflate_fonts=True,
+            use_objstms=1,
+        )
+    return optimized if len(optimized) < len(data) else None
+
+
+def linearize_pdf(data):
+    """
+    Rewrite ``data`` as a linearised ("fast web view") PDF, so a viewer can
+    show the first page after fetching only the start of the file. Returns
+    None if the PDF is already linearised.
+
+    PyMuPDF dropped linearisation support, so this goes through qpdf.
+    """
+    with pikepdf.open(BytesIO(data)) as pdf:
+        if pdf.is_linearized:
+            return None
+        buffer = BytesIO()
+        pdf.save(buffer, linearize=True)
+    return buffer.getvalue()
+
+
+def web_pdf(data, optimize=True, image_dpi=150, dpi_threshold=200, image_quality=75):
+    """
+    The bytes to serve for an uploaded PDF: optimised (if ``optimize``) and
+    linearised. Returns ``data`` itself when neither step changes anything.
+    """
+    served = data
+    if optimize:
+        served = optimize_pdf(served, image_dpi=image_dpi, dpi_threshold=dpi_threshold, image_quality=image_quality) or served
+    return linearize_pdf(served) or served
+
+
+def render_page_images(pdf_path, page_index, widths, tile_size=0, quality=75):
+    """
+    Render one page to WebP at every width in ``widths``. If ``tile_size`` is
+    set, the largest width is cut into square tiles instead of one image.
+
+    Returns ``(page, files)``: the page's manifest entry and a list of
+    ``(filename, bytes)``. Runs in a worker process, so it opens the PDF by
+    path rather than receiving a document.
+    """
+    with pymupdf.open(pdf_path) as document:
+        page = document.load_page(page_index)
+        rect = page.rect
+        number = page_index + 1
+
+        entry = {'number': number, 'width': rect.width, 'height': rect.height, 'images': {}}
+        files = []
+        for width in sorted(widths):
+            zoom = width / rect.width
+            matrix = pymupdf.Matrix(zoom, zoom)
+
+            if not (tile_size and width == max(widths) and width > tile_size):
+                name = f"p{number}-{width}.webp"
+                pix = page.get_pixmap(matrix=matrix, alpha=False)
+                files.append((name, pixmap_to_webp(pix, quality)))
+                entry['images'][str(width)] = name
+                continue
+
+            height = rect.height * zoom
+            columns, rows = math.ceil(width / tile_size), math.ceil(height / tile_size)
+            tiles = []
+            for row in range(rows):
+                for column in range(columns):
+                    clip = pymupdf.Rect(
+                        rect.x0 + column * tile_size / zoom,
+                        rect.y0 + row * tile_size / zoom,
+                        rect.x0 + min(width, (column + 1) * tile_size) / zoom,
+                        rect.y0 + min(height, (row + 1) * tile_size) / zoom,
+                    )
+                    name = f"p{number}-{width}-{row}-{column}.webp"
+                    pix = page.get_pixmap(matrix=matrix, clip=clip, alpha=False)
+                    files.append((name, pixmap_to_webp(pix, quality)))
+                    tiles.append(name)
+            entry['tiles'] = {'width': width, 'size': tile_size, 'columns': columns, 'rows': rows, 'names': tiles}
+
+        return entry, files
+
+
+def extract_page_text(pdf_path, page_index):
+    """
+    Text of one page plus the position of every word, as fractions of the
+    page size so the boxes line up with a rendition of any width. Runs in a
+    worker process, like ``render_page_images``.
+    """
+    with pymupdf.open(pdf_path) as document:
+        page = document.load_page(page_index)
+        rect = page.rect
+        words = [
+            [
+                round((x0 - rect.x0) / rect.width, 4),
+                round((y0 - rect.y0) / rect.height, 4),
+                round((x1 - rect.x0) / rect.width, 4),
+                round((y1 - rect.y0) / rect.height, 4),
+                word,
+            ]
+            for x0, y0, x1, y1, word, *_ in page.get_text('words', sort=True)
+        ]
+        return {
+            'number': page_index + 1,
+            'text': page.get_text('text', sort=True),
+            'words': words,
+        }
+
+
+def manifest_files(manifest):
+    """
+    Every storage name referenced by a page manifest.
+    """
+    for page in (manifest or {}).get('pages', []):
+        yield from page['images'].values()
+        if 'tiles' in page:
+            yield from page['tiles']['names']
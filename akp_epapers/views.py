@@ -1,49 +1,161 @@
+import datetime
+
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.contrib.auth.decorators import login_required
-from .models import Epaper, EpaperDownload, ShortURL
+from django.core.paginator import Paginator
+from django.urls import reverse
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_safe
+from akp_accounts.forms import get_client_ip
+from akp_media.ranges import RangeNotSatisfiable, requested_range, storage_file_response
+from .archive import archive_entry, archive_index, archive_rows, month_calendar
+from .downloads import count_download, recorder
+from .models import Epaper, ShortURL
+from .search import page_hits, page_snippet, query_terms, search_pages
+from .short_urls import resolve_short_url
 
 # Create your views here.
 
 def view_epaper(request, epaper_id):
-    epaper = get_object_or_404(Epaper, id=epaper_id)
+    epaper = get_object_or_404(Epaper.objects.select_related('short_url'), id=epaper_id)
     filename = str(epaper.file.name).split('/')[-1]
 
-    short_url, created = ShortURL.objects.get_or_create(epaper=epaper)
-    if created:
-        short_url.save()
-
     context = {
         'epaper': epaper,
         'filename': filename,
+        'page_images': epaper.get_page_images(),
     }
 
     return render(request, template_name="epapers/epaper_detail.html", context=context)
 
+@require_safe
+def epaper_pdf_view(request, epaper_id):
+    """
+    The e-paper PDF with Range support, so the viewer only fetches the bytes
+    of the pages being read. On R2 this redirects to a presigned URL.
+    """
+    epaper = get_object_or_404(Epaper, id=epaper_id)
+    if not epaper.file:
+        return JsonResponse({'status': 'error', 'message': 'E-Paper file not found.'}, status=404)
+
+    return storage_file_response(request, epaper.file.storage, epaper.file.name, 'application/pdf')
+
+def epaper_search_api(request):
+    """
+    Search the extracted e-paper text: ``q`` plus optional ``date``
+    (YYYY-MM-DD) and ``edition``. Each hit is a page, with a snippet and the
+    word boxes to highlight.
+    """
+    query = request.GET.get('q', '').strip()
+    edition = request.GET.get('edition', '').strip()
+    date = None
+    if request.GET.get('date'):
+        try:
+            date = parse_date(request.GET['date'])
+        except ValueError:
+            date = None
+        if date is None:
+            return JsonResponse({'status': 'error', 'message': 'Invalid date, expected YYYY-MM-DD.'}, status=400)
+
+    paginator = Paginator(search_pages(query, date=date, edition=edition), 20)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    terms = query_terms(query)
+
+    results = []
+    for page in page_obj:
+        epaper = page.epaper
+        results.append({
+            'epaper_id': str(epaper.id),
+            'title': epaper.meta_title,
+            'date': epaper.timestamp.isoformat() if epaper.timestamp else None,
+            'edition': epaper.edition,
+            'page': page.number,
+            'url': f"{reverse('view_epaper', kwargs={'epaper_id': epaper.id})}?page={page.number}",
+            'snippet': page_snippet(page.text, terms),
+            'boxes': page_hits(page.words, terms),
+        })
+
+    return JsonResponse({
+        'query': query,
+        'count': paginator.count,
+        'page': page_obj.number,
+        'num_pages': paginator.num_pages,
+        'results': results,
+    })
+
+def epaper_archive_view(request):
+    paginator = Paginator(archive_rows(), getattr(settings, 'EPAPER_ARCHIVE_PAGE_SIZE', 24))
+    page_obj = paginator.get_page(request.GET.get('page'))
+
+    context = {
+        'page_obj': page_obj,
+        'epapers': [archive_entry(row) for row in page_obj],
+        'epaper_download_limit': settings.EPAPER_DOWNLOAD_LIMIT,
+    }
+    return render(request, template_name="epapers/epaper_archive.html", context=context)
+
+def epaper_calendar_api(request):
+    """
+    The e-papers of one month (``month=YYYY-MM``, default the latest month
+    with an e-paper), keyed by day of month, from the cached archive index.
+    """
+    month = request.GET.get('month', '').strip()
+    if month:
+        try:
+            first = datetime.datetime.strptime(month, '%Y-%m').date()
+        except ValueError:
+            return JsonResponse({'status': 'error', 'message': 'Invalid month, expected YYYY-MM.'}, status=400)
+    else:
+        index = archive_index()
+        first = index[0][1] if index else datetime.date.today()
+
+    data = month_calendar(first.year, first.month)
+    data['days'] = {
+        day: [dict(entry, date=entry['date'].isoformat()) for entry in entries]
+        for day, entries in data['days'].items()
+    }
+    return JsonResponse(data)
+
 def redirect_short_url(request, short_url):
-    short_url_obj = get_object_or_404(ShortURL, short_url=short_url)
+    try:
+        return redirect(resolve_short_url(short_url))
+    except ShortURL.DoesNotExist:
+        raise Http404("Short URL not found.")
 
-    return redirect(short_url_obj.epaper.get_new_absolute_url())
+def is_resumed_download(request, epaper):
+    """
+    True when the response will start past the first byte of the file, i.e.
+    the rest of a download that was already counted.
+    """
+    try:
+        byte_range = requested_range(request, epaper.file.storage, epaper.file.name)
+    except RangeNotSatisfiable:
+        # Answered with a 416; no bytes are sent.
+        return True
+    return byte_range is not None and byte_range[0] > 0
 
 @login_required
 def download_epaper_view(request, epaper_id):
     epaper = get_object_or_404(Epaper, id=epaper_id)
 
-    DOWNLOAD_LIMIT = 365
+    if not epaper.file:
+        return JsonResponse({'status': 'error', 'message': 'E-Paper file not found.'}, status=404)
 
-    if request.user.epaper_downloads >= DOWNLOAD_LIMIT:
-        return JsonResponse({'status': 'error', 'message': 'You have reached the download limit for this epaper.'}, status=400)
-    
-    request.user.epaper_downloads += 1
-    request.user.save()
+    # Resumed downloads ask for the rest of the file with a Range header;
+    # only the request for the start of the file counts against the limit.
+    if not is_resumed_download(request, epaper):
+        if not count_download(request.user):
+            return JsonResponse({'status': 'error', 'message': 'You have reached the download limit for this epaper.'}, status=400)
 
-    EpaperDownload.objects.create(customer=request.user, epaper=epaper)
+        recorder.record(epaper.id, request.user.pk, get_client_ip(request))
 
-    if epaper.file and hasattr(epaper.file, 'url'):
-        return redirect(epaper.file.url)
-        return JsonResponse({'status': 'success', 'url': epaper.file.url}, status=200)
-    else:
-        return JsonResponse({'status': 'error', 'message': 'E-Paper file not found.'}, status=404)
+    filename = str(epaper.file.name).split('/')[-1]
+    return storage_file_response(
+        request, epaper.file.storage, epaper.file.name, 'application/pdf',
+        filename=filename, as_attachment=True,
+    )
 
 
     
\ No newline at end of file
@@ -0,0 +1,29 @@
+from django.contrib import admin
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from akp_accounts.admin import limited_admin_site
+from .models import MediaJob
+
+
+class MediaJobAdmin(admin.ModelAdmin):
+    list_display = ('task', 'model_label', 'object_id', 'status', 'attempts', 'run_after', 'finished_at')
+    list_filter = ('status', 'task')
+    search_fields = ('object_id', 'source', 'last_error')
+    readonly_fields = ('created_at', 'updated_at', 'locked_by', 'locked_at', 'finished_at', 'last_error')
+    actions = ['retry_jobs']
+
+    def retry_jobs(self, request, queryset):
+        for job in queryset.filter(status=MediaJob.STATUS_FAILED):
+            try:
+                with transaction.atomic():
+                    MediaJob.objects.filter(pk=job.pk).update(
+                        status=MediaJob.STATUS_PENDING, attempts=0, run_after=timezone.now()
+                    )
+            except IntegrityError:
+                # A newer pending job already covers this target.
+                continue
+    retry_jobs.short_description = "Retry selected failed jobs"
+
+
+limited_admin_site.register(MediaJob, MediaJobAdmin)
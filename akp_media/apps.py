@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class AkpMediaConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "akp_media"
+
+    def ready(self):
+        # Every app keeps its media handlers in a ``tasks`` module, the same
+        # way the admin discovers ``admin`` modules.
+        autodiscover_modules('tasks')
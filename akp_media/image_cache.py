@@ -0,0 +1,137 @@
+"""
+Size-bounded on-disk LRU cache for resized image derivatives.
+
+Entries are written once through a temp file and ``os.replace``, hits refresh
+the file's mtime, and the oldest entries are evicted when the directory grows
+past its budget. Concurrent requests for the same derivative are coalesced
+with a striped file lock, so only one process renders it.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class DiskLRUCache:
+    LOCK_STRIPES = 64
+
+    def __init__(self, directory, max_bytes):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        self._thread_locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+        self._written_since_scan = 0
+        self._scan_lock = threading.Lock()
+
+    def path_for(self, key):
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def get(self, key):
+        path = self.path_for(key)
+        try:
+            # Touch on hit: eviction removes the least recently used files.
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def get_or_create(self, key, producer):
+        """
+        Return the cached file path for ``key``, calling ``producer()`` for the
+        bytes on a miss. Only one caller per key runs the producer; the others
+        wait on the lock and then read its result.
+        """
+        path = self.get(key)
+        if path:
+            return path
+
+        with self._lock(key):
+            path = self.get(key)
+            if path:
+                return path
+            data = producer()
+            path = self._write(key, data)
+
+        self._written_since_scan += len(data)
+        # Rescan once this process has written a slice of the budget; other
+        # processes do the same, so the overshoot stays bounded.
+        if self._written_since_scan > self.max_bytes // 20:
+            self.evict()
+        return path
+
+    def evict(self):
+        with self._scan_lock:
+            self._written_since_scan = 0
+            entries = []
+            total = 0
+            for root, dirs, files in os.walk(self.directory):
+                if root == self._lock_dir:
+                    continue
+                for name in files:
+                    if name.endswith('.tmp'):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+
+            if total <= self.max_bytes:
+                return
+
+            # Evict down to 90% so we don't rescan on the very next write.
+            target = self.max_bytes * 0.9
+            entries.sort()
+            for mtime, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    continue
+            logger.info(f"Image cache evicted down to {total} bytes")
+
+    @property
+    def _lock_dir(self):
+        return os.path.join(self.directory, 'locks')
+
+    @contextmanager
+    def _lock(self, key):
+        stripe = int(hashlib.sha1(key.encode()).hexdigest()[:8], 16) % self.LOCK_STRIPES
+        with self._thread_locks[stripe]:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self._lock_dir, exist_ok=True)
+            with open(os.path.join(self._lock_dir, f"{stripe}.lock"), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write(self, key, data):
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return path
@@ -0,0 +1,162 @@
+"""
+Database-backed queue for media processing jobs.
+
+Model saves call ``enqueue_job`` and return immediately; ``run_media_worker``
+claims pending jobs and runs the handler registered for the job's task.
+"""
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import MediaJob
+
+logger = logging.getLogger(__name__)
+
+_tasks = {}
+
+ENQUEUE_ATTEMPTS = 3
+
+
+def register_task(name):
+    """
+    Decorator registering ``func(instance, job)`` as the handler for ``name``.
+    Handlers must be idempotent: a job may run more than once after a crash.
+    """
+    def decorator(func):
+        _tasks[name] = func
+        return func
+    return decorator
+
+
+def get_task(name):
+    return _tasks.get(name)
+
+
+def job_object_id(model, pk):
+    # UUID keys may be a hex string on a fresh instance and a UUID once
+    # loaded; normalise so both map to the same pending job.
+    return str(model._meta.pk.to_python(pk))
+
+
+def enqueue_job(task, instance, source=''):
+    """
+    Queue ``task`` for ``instance``. If a pending job already exists for the
+    same target it is refreshed instead of duplicated.
+    """
+    lookup = {
+        'task': task,
+        'model_label': instance._meta.label_lower,
+        'object_id': job_object_id(type(instance), instance.pk),
+        'status': MediaJob.STATUS_PENDING,
+    }
+    defaults = {
+        'source': source or '',
+        'attempts': 0,
+        'max_attempts': getattr(settings, 'MEDIA_JOB_MAX_ATTEMPTS', 5),
+        'run_after': timezone.now(),
+        'last_error': '',
+    }
+    for attempt in range(ENQUEUE_ATTEMPTS):
+        try:
+            job, created = MediaJob.objects.update_or_create(**lookup, defaults=defaults)
+            return job
+        except IntegrityError:
+            # A concurrent save inserted the pending job between our lookup
+            # and insert (and a worker may have claimed it since); look again.
+            if attempt == ENQUEUE_ATTEMPTS - 1:
+                raise
+            logger.info(f"Pending {task} job for {lookup['model_label']} {lookup['object_id']} raced; retrying")
+
+
+def get_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _claimable(now):
+    lease = getattr(settings, 'MEDIA_JOB_LEASE_SECONDS', 600)
+    return (
+        Q(status=MediaJob.STATUS_PENDING, run_after__lte=now)
+        # Jobs whose worker died mid-run become claimable again after the lease.
+        | Q(status=MediaJob.STATUS_RUNNING, locked_at__lt=now - timedelta(seconds=lease))
+    )
+
+
+def claim_next_job(worker_id):
+    """
+    Claim the oldest runnable job with a conditional UPDATE, so several worker
+    processes can poll the same table without handing out a job twice.
+    """
+    now = timezone.now()
+    candidates = list(
+        MediaJob.objects.filter(_claimable(now)).order_by('run_after').values_list('pk', flat=True)[:10]
+    )
+    for pk in candidates:
+        claimed = MediaJob.objects.filter(_claimable(now), pk=pk).update(
+            status=MediaJob.STATUS_RUNNING,
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return MediaJob.objects.get(pk=pk)
+    return None
+
+
+def run_job(job):
+    """
+    Run a claimed job and record the outcome. Returns True on success.
+    """
+    handler = get_task(job.task)
+    try:
+        if handler is None:
+            raise LookupError(f"No media task registered as '{job.task}'")
+        model = apps.get_model(job.model_label)
+        instance = model._default_manager.filter(pk=job.object_id).first()
+        # A deleted target leaves nothing to do.
+        if instance is not None:
+            handler(instance, job)
+    except Exception as e:
+        logger.exception(f"Media job {job.pk} ({job.task}) failed")
+        _mark_failed(job, e)
+        return False
+
+    MediaJob.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        status=MediaJob.STATUS_DONE,
+        finished_at=timezone.now(),
+        last_error='',
+    )
+    return True
+
+
+def _mark_failed(job, error):
+    now = timezone.now()
+    details = ''.join(traceback.format_exception_only(type(error), error)).strip()
+    jobs = MediaJob.objects.filter(pk=job.pk, locked_by=job.locked_by)
+
+    if job.attempts >= job.max_attempts:
+        jobs.update(status=MediaJob.STATUS_FAILED, finished_at=now, last_error=details)
+        return
+
+    delay = getattr(settings, 'MEDIA_JOB_RETRY_DELAY', 30) * 2 ** (job.attempts - 1)
+    try:
+        with transaction.atomic():
+            jobs.update(
+                status=MediaJob.STATUS_PENDING,
+                run_after=now + timedelta(seconds=delay),
+                locked_by='',
+                locked_at=None,
+                last_error=details,
+            )
+    except IntegrityError:
+        # A newer pending job for the same target exists and will redo the
+        # work from the latest source, so this attempt can be retired.
+        jobs.update(status=MediaJob.STATUS_DONE, finished_at=now, last_error=f"Superseded after: {details}")
+
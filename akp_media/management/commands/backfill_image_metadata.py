@@ -0,0 +1,52 @@
+"""
+Management command to queue placeholder and dimension computation for images
+uploaded before they were recorded on save
+"""
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from akp_media.jobs import job_object_id
+from akp_media.models import MediaJob
+from akp_media.processing import get_image_tasks
+
+
+class Command(BaseCommand):
+    help = 'Queue media jobs for every image that has no placeholder yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of jobs inserted per query',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+
+        for task, model_label, field_name in get_image_tasks():
+            model = apps.get_model(model_label)
+            rows = (
+                model._default_manager
+                .exclude(**{f"{field_name}__isnull": True})
+                .exclude(**{field_name: ''})
+                .filter(**{f"{field_name}_placeholder": ''})
+                .values_list('pk', field_name)
+            )
+
+            now = timezone.now()
+            jobs = [
+                MediaJob(task=task, model_label=model_label, object_id=job_object_id(model, pk), source=name, run_after=now)
+                for pk, name in rows.iterator()
+            ]
+            # Targets that already have a pending job are skipped by the
+            # unique constraint.
+            MediaJob.objects.bulk_create(jobs, batch_size=batch_size, ignore_conflicts=True)
+            total += len(jobs)
+            self.stdout.write(f"✓ {model_label}.{field_name}: {len(jobs)} image(s) queued")
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Queued {total} image(s); run_media_worker will process them')
+        )
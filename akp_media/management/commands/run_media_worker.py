@@ -0,0 +1,89 @@
+"""
+Management command that processes queued media jobs outside the web workers
+"""
+import multiprocessing
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from akp_media.jobs import claim_next_job, get_worker_id, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run media processing workers (image optimisation, e-paper rendering)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=getattr(settings, 'MEDIA_WORKER_PROCESSES', 2),
+            help='Number of worker processes to start',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to sleep when the queue is empty',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the queue and exit instead of polling forever',
+        )
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        poll_interval = options['poll_interval']
+        once = options['once']
+
+        if processes == 1:
+            self.work(poll_interval, once)
+            return
+
+        # Children must open their own database connections.
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=self.work, args=(poll_interval, once), name=f"media-worker-{i}")
+            for i in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Started {processes} media worker processes")
+
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.join()
+
+        self.stdout.write(self.style.SUCCESS('Media workers stopped'))
+
+    def work(self, poll_interval, once):
+        self.stopping = False
+
+        def stop(signum, frame):
+            self.stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        worker_id = get_worker_id()
+        processed = 0
+        while not self.stopping:
+            close_old_connections()
+            job = claim_next_job(worker_id)
+            if job is None:
+                if once:
+                    break
+                time.sleep(poll_interval)
+                continue
+            if run_job(job):
+                processed += 1
+
+        self.stdout.write(f"[{worker_id}] processed {processed} job(s)")
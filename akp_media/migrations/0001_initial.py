@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:43
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('task', models.CharField(help_text="Registered task name, e.g. 'news.featured_image'", max_length=100)),
+                ('model_label', models.CharField(help_text="Target model, e.g. 'akp_news.news'", max_length=100)),
+                ('object_id', models.CharField(max_length=64)),
+                ('source', models.CharField(blank=True, help_text='Field value the job was enqueued for. Stale jobs are skipped.', max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=5)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_by', models.CharField(blank=True, max_length=100)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Media Job',
+                'verbose_name_plural': 'Media Jobs',
+                'ordering': ['run_after'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='media_job_status_run_after')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('task', 'model_label', 'object_id'), name='unique_pending_media_job')],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+from akp_news.base import BaseModel
+
+
+class MediaJob(BaseModel):
+    """
+    A unit of heavy media work (image optimisation, PDF rendering, ...) that
+    runs in ``run_media_worker`` instead of inside the admin request.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    task = models.CharField(max_length=100, help_text="Registered task name, e.g. 'news.featured_image'")
+    model_label = models.CharField(max_length=100, help_text="Target model, e.g. 'akp_news.news'")
+    object_id = models.CharField(max_length=64)
+    source = models.CharField(max_length=255, blank=True, help_text="Field value the job was enqueued for. Stale jobs are skipped.")
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = "Media Job"
+        verbose_name_plural = "Media Jobs"
+        ordering = ['run_after']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='media_job_status_run_after'),
+        ]
+        constraints = [
+            # Only one pending job per target and task: re-uploading before the
+            # worker gets to it just refreshes the existing row.
+            models.UniqueConstraint(
+                fields=['task', 'model_label', 'object_id'],
+                condition=Q(status='pending'),
+                name='unique_pending_media_job',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task} for {self.model_label}:{self.object_id} ({self.status})"
@@ -0,0 +1,136 @@
+"""
+Helpers used by media task handlers to produce derived files off the request
+path and swap them onto the model row atomically.
+"""
+import logging
+import os
+
+from django.db import transaction
+
+from PIL import Image, ImageOps
+
+from Base.helpers import image_placeholder, optimize_image
+from .jobs import register_task
+
+logger = logging.getLogger(__name__)
+
+
+class MediaProcessingError(Exception):
+    pass
+
+
+def commit_if_unchanged(instance, source_field, source, **values):
+    """
+    Write ``values`` to the row only if ``source_field`` still holds ``source``.
+
+    The compare-and-set UPDATE means a newer upload saved while the job was
+    running is never overwritten by a derivative of the older file.
+    """
+    model = type(instance)
+    with transaction.atomic():
+        updated = model._default_manager.filter(
+            pk=instance.pk, **{source_field: source}
+        ).update(**values)
+    if not updated:
+        logger.info(f"{model._meta.label}:{instance.pk} {source_field} changed while processing")
+    return bool(updated)
+
+
+def save_derivative(instance, field_name, content):
+    """
+    Store ``content`` under ``field_name``'s upload path without touching the row.
+    """
+    field = instance._meta.get_field(field_name)
+    filename = os.path.basename(content.name)
+    return field.storage.save(field.generate_filename(instance, filename), content)
+
+
+def swap_file(instance, field_name, source, new_name, **extra):
+    """
+    Point ``field_name`` at ``new_name`` if it still holds ``source``; the
+    orphaned derivative is removed otherwise. ``extra`` fields are written in
+    the same statement.
+    """
+    swapped = commit_if_unchanged(instance, field_name, source, **{field_name: new_name}, **extra)
+    if not swapped:
+        getattr(instance, field_name).storage.delete(new_name)
+    return swapped
+
+
+def image_metadata_fields(model, field_name, img):
+    """
+    Values for the ``<field>_width``, ``<field>_height`` and
+    ``<field>_placeholder`` columns the model declares for ``field_name``.
+    """
+    img = ImageOps.exif_transpose(img)
+    values = {}
+    field_names = {field.name for field in model._meta.concrete_fields}
+    if f"{field_name}_width" in field_names:
+        values[f"{field_name}_width"], values[f"{field_name}_height"] = img.size
+    if f"{field_name}_placeholder" in field_names:
+        values[f"{field_name}_placeholder"] = image_placeholder(img)
+    return values
+
+
+def process_image_field(instance, field_name, source, optimize=True, **options):
+    """
+    Optimise the image stored in ``field_name`` and swap the result in,
+    together with its dimensions and placeholder. With ``optimize=False``, or
+    when the file is already a small enough WebP, only the metadata is
+    computed. ``options`` are passed to ``optimize_image``.
+    """
+    field_file = getattr(instance, field_name)
+    if not field_file or field_file.name != source:
+        # Superseded by a later upload; its own job will handle it.
+        return False
+
+    max_width = options.get('max_width', 1000)
+    with field_file.open('rb'):
+        img = Image.open(field_file)
+        img.load()
+        needs_encoding = optimize and (img.format != 'WEBP' or img.width > max_width)
+        if needs_encoding:
+            field_file.seek(0)
+            optimized = optimize_image(field_file, **options)
+            if optimized is None:
+                raise MediaProcessingError(f"Could not optimise {source}")
+
+    model = type(instance)
+    if not needs_encoding:
+        return commit_if_unchanged(instance, field_name, source, **image_metadata_fields(model, field_name, img))
+
+    new_name = save_derivative(instance, field_name, optimized)
+    optimized.seek(0)
+    metadata = image_metadata_fields(model, field_name, Image.open(optimized))
+    return swap_file(instance, field_name, source, new_name, **metadata)
+
+
+_image_tasks = []
+
+
+def register_image_task(name, model_label, field_name, on_change=None, **options):
+    """
+    Register the standard image handler for ``model_label.field_name``.
+    ``options`` are passed to ``process_image_field``; ``on_change(instance)``
+    is called after the processed image or its metadata has been written.
+    """
+    def handler(instance, job):
+        if process_image_field(instance, field_name, job.source, **options) and on_change:
+            on_change(instance)
+
+    register_task(name)(handler)
+    _image_tasks.append((name, model_label, field_name))
+
+
+def get_image_tasks():
+    return list(_image_tasks)
+
+
+def clear_image_metadata(instance, field_name):
+    """
+    Forget the dimensions and placeholder of a replaced image until its job
+    recomputes them, so templates never pair a new image with old metadata.
+    """
+    for suffix, empty in (('_width', None), ('_height', None), ('_placeholder', '')):
+        if hasattr(instance, f"{field_name}{suffix}"):
+            setattr(instance, f"{field_name}{suffix}", empty)
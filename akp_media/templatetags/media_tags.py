@@ -0,0 +1,25 @@
+from django import template
+from django.conf import settings
+from django.urls import reverse
+
+from akp_media.views import is_proxied_path
+
+register = template.Library()
+
+
+@register.filter
+def resized(image, width):
+    """
+    URL of ``image`` resized through the image proxy, e.g.
+    ``{{ article.featured_image|resized:640 }}``. Widths snap up to the next
+    allowed size; files outside the proxied folders keep their storage URL.
+    """
+    if not image:
+        return ''
+    name = getattr(image, 'name', image)
+    if not is_proxied_path(name):
+        return image.url
+
+    widths = sorted(settings.IMAGE_PROXY_WIDTHS)
+    width = next((w for w in widths if w >= int(width)), widths[-1])
+    return reverse('resized_image', kwargs={'width': width, 'path': name})
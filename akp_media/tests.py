@@ -0,0 +1,212 @@
+import io
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import IntegrityError
+from django.db.models import QuerySet
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from PIL import Image
+
+from akp_epapers.models import Epaper
+from Base.helpers import resize_image
+from . import views
+from .image_cache import DiskLRUCache
+from .jobs import enqueue_job
+from .models import MediaJob
+from .ranges import storage_file_response
+
+
+def jpeg_bytes(color, size=(1200, 800)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+class ResizedImageTests(SimpleTestCase):
+    """
+    The image proxy against a FileSystemStorage standing in for R2.
+    """
+
+    def setUp(self):
+        media_dir = tempfile.mkdtemp()
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_dir)
+        self.addCleanup(shutil.rmtree, cache_dir)
+        settings_override = override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'image-proxy-tests'}},
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+                'image_proxy_test': {
+                    'BACKEND': 'django.core.files.storage.FileSystemStorage',
+                    'OPTIONS': {'location': media_dir},
+                },
+            },
+            IMAGE_PROXY_STORAGE='image_proxy_test',
+            IMAGE_PROXY_CACHE_DIR=cache_dir,
+            IMAGE_PROXY_FORMATS=('webp', 'jpeg'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        views._image_cache = None
+        self.addCleanup(setattr, views, '_image_cache', None)
+        cache.clear()
+
+        self.storage = storages['image_proxy_test']
+        self.storage.save('news_images/photo.jpg', ContentFile(jpeg_bytes('red')))
+
+    def get(self, url, **headers):
+        return Client().get(url, headers=headers)
+
+    def image(self, response):
+        return Image.open(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_resizes_and_negotiates_the_format(self):
+        response = self.get('/img/320/news_images/photo.jpg', accept='image/webp,*/*')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertIn('Accept', response['Vary'])
+        image = self.image(response)
+        self.assertEqual((image.format, image.width), ('WEBP', 320))
+
+        response = self.get('/img/320/news_images/photo.jpg', accept='*/*')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(self.image(response).format, 'JPEG')
+
+    def test_only_allowed_widths_and_folders(self):
+        self.assertEqual(self.get('/img/321/news_images/photo.jpg').status_code, 404)
+        self.assertEqual(self.get('/img/320/private/photo.jpg').status_code, 404)
+        self.assertEqual(self.get('/img/320/news_images/../photo.jpg').status_code, 404)
+        self.assertEqual(self.get('/img/320/news_images/missing.jpg').status_code, 404)
+
+    def test_not_modified(self):
+        etag = self.get('/img/320/news_images/photo.jpg')['ETag']
+        response = self.get('/img/320/news_images/photo.jpg', if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(IMAGE_PROXY_SOURCE_CHECK_SECONDS=0)
+    def test_overwritten_original_is_rendered_again(self):
+        first = self.get('/img/320/news_images/photo.jpg')
+        self.assertGreater(self.image(first).getpixel((10, 10))[0], 200)
+
+        path = self.storage.path('news_images/photo.jpg')
+        with open(path, 'wb') as original:
+            original.write(jpeg_bytes('blue', size=(1000, 700)))
+        os.utime(path, (os.path.getmtime(path) + 10,) * 2)
+
+        second = self.get('/img/320/news_images/photo.jpg', if_none_match=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        red, green, blue = self.image(second).getpixel((10, 10))[:3]
+        self.assertGreater(blue, red)
+
+    def test_concurrent_requests_render_once(self):
+        calls = []
+
+        def slow_resize(*args, **kwargs):
+            calls.append(1)
+            return resize_image(*args, **kwargs)
+
+        responses = []
+        with mock.patch.object(views, 'resize_image', side_effect=slow_resize):
+            threads = [
+                threading.Thread(target=lambda: responses.append(self.get('/img/640/news_images/photo.jpg')))
+                for _ in range(6)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual([response.status_code for response in responses], [200] * 6)
+        self.assertEqual(len(calls), 1)
+
+
+class DiskLRUCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_evicts_least_recently_used(self):
+        image_cache = DiskLRUCache(self.directory, max_bytes=10 ** 6)
+        paths = {}
+        for index, key in enumerate(('a', 'b', 'c')):
+            paths[key] = image_cache.get_or_create(key, lambda: b'x' * 1000)
+            os.utime(paths[key], (1000 + index,) * 2)
+        # Reading 'a' makes 'b' the oldest.
+        image_cache.get('a')
+        image_cache.max_bytes = 2500
+        image_cache.evict()
+        self.assertTrue(os.path.exists(paths['a']))
+        self.assertFalse(os.path.exists(paths['b']))
+        self.assertTrue(os.path.exists(paths['c']))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'ranges-tests'}})
+class StorageFileResponseTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.storage = FileSystemStorage(location=directory)
+        self.storage.save('epapers/paper.pdf', ContentFile(bytes(range(100))))
+
+    def respond(self, storage, **headers):
+        request = RequestFactory().get('/', headers=headers)
+        return storage_file_response(request, storage, 'epapers/paper.pdf', 'application/pdf')
+
+    def test_local_files_honour_range(self):
+        response = self.respond(self.storage, range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+
+        response = self.respond(self.storage, range='bytes=100-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_bucket_storages_redirect(self):
+        bucket_storage = mock.Mock(spec=['bucket', 'url'])
+        bucket_storage.url.return_value = 'https://r2.example.com/epapers/paper.pdf?X-Amz-Signature=abc'
+        response = self.respond(bucket_storage, range='bytes=10-19')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], bucket_storage.url.return_value)
+        self.assertEqual(response['Cache-Control'], 'private, no-store')
+        bucket_storage.url.assert_called_once_with(
+            'epapers/paper.pdf', parameters={'ResponseContentType': 'application/pdf'}, expire=600,
+        )
+
+
+class EnqueueJobTests(TestCase):
+
+    def test_refreshes_the_pending_job(self):
+        paper = Epaper(meta_title='Paper')
+        first = enqueue_job('epapers.test', paper, source='a.pdf')
+        # Loaded from the database the hex string pk becomes a UUID.
+        paper.pk = Epaper._meta.pk.to_python(paper.pk)
+        second = enqueue_job('epapers.test', paper, source='b.pdf')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(MediaJob.objects.get().source, 'b.pdf')
+
+    def test_retries_after_a_concurrent_insert(self):
+        paper = Epaper(meta_title='Paper')
+        update_or_create = QuerySet.update_or_create
+        calls = []
+
+        def racing_update_or_create(queryset, **kwargs):
+            calls.append(1)
+            if len(calls) == 1:
+                # Another process inserts the pending job first.
+                update_or_create(MediaJob.objects.all(), **kwargs)
+                raise IntegrityError('UNIQUE constraint failed')
+            return update_or_create(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update_or_create', racing_update_or_create):
+            job = enqueue_job('epapers.test', paper, source='a.pdf')
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(list(MediaJob.objects.values_list('pk', flat=True)), [job.pk])
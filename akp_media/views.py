@@ -0,0 +1,132 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import storages
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_safe
+from PIL import features
+
+from Base.helpers import resize_image
+from .image_cache import DiskLRUCache
+
+# The rendition depends on these request headers; shared caches must key on them.
+NEGOTIATED_HEADERS = ('Accept', 'Save-Data', 'ECT')
+
+IMAGE_CONTENT_TYPES = {
+    'avif': 'image/avif',
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+}
+AVIF_SUPPORTED = features.check('avif')
+
+_image_cache = None
+
+
+def get_image_cache():
+    global _image_cache
+    if _image_cache is None:
+        _image_cache = DiskLRUCache(settings.IMAGE_PROXY_CACHE_DIR, settings.IMAGE_PROXY_CACHE_MAX_BYTES)
+    return _image_cache
+
+
+def is_proxied_path(path):
+    return (
+        path.startswith(tuple(settings.IMAGE_PROXY_PREFIXES))
+        and '..' not in path.split('/')
+    )
+
+
+def negotiate_format(request):
+    """
+    Pick the best image format the client explicitly accepts, falling back
+    to JPEG, which every browser and feature phone can decode.
+    """
+    accepted = {f"{media_type.main_type}/{media_type.sub_type}" for media_type in request.accepted_types}
+    for image_format in settings.IMAGE_PROXY_FORMATS:
+        if image_format == 'avif' and not AVIF_SUPPORTED:
+            continue
+        if IMAGE_CONTENT_TYPES[image_format] in accepted:
+            return image_format
+    return 'jpeg'
+
+
+def wants_reduced_data(request):
+    return (
+        request.headers.get('Save-Data', '').strip().lower() == 'on'
+        or request.headers.get('ECT', '').strip().lower() in settings.IMAGE_PROXY_SLOW_ECT
+    )
+
+
+def source_version(storage, path):
+    """
+    ``size-mtime`` of the original, which changes when an upload overwrites
+    it. S3 answers each with a HEAD request, so it is cached for
+    IMAGE_PROXY_SOURCE_CHECK_SECONDS.
+    """
+    key = 'img-source:%s' % hashlib.sha1(path.encode()).hexdigest()
+    version = cache.get(key)
+    if version is None:
+        version = f"{storage.size(path)}-{storage.get_modified_time(path).timestamp():.0f}"
+        cache.set(key, version, settings.IMAGE_PROXY_SOURCE_CHECK_SECONDS)
+    return version
+
+
+def _variant_response(response, etag):
+    response['ETag'] = etag
+    # The URL stays the same when the original is overwritten, so browsers
+    # and the CDN revalidate against the versioned ETag instead of keeping
+    # the rendition forever.
+    response['Cache-Control'] = f'public, max-age={settings.IMAGE_PROXY_MAX_AGE}'
+    patch_vary_headers(response, NEGOTIATED_HEADERS)
+    return response
+
+
+@require_safe
+def resized_image(request, width, path):
+    """
+    Serve ``path`` from the media storage resized to ``width`` pixels.
+
+    Only allow-listed widths and upload folders are served, so arbitrary
+    sizes can't be used to fill the cache. The format is negotiated from
+    ``Accept`` and the quality drops a step for ``Save-Data``/slow ``ECT``
+    clients; each combination is cached as its own derivative, keyed by the
+    original's size and modification time so an overwritten upload is
+    rendered afresh.
+    """
+    if width not in settings.IMAGE_PROXY_WIDTHS or not is_proxied_path(path):
+        raise Http404("Image size not available.")
+
+    image_format = negotiate_format(request)
+    tier = 'lite' if wants_reduced_data(request) else 'full'
+    quality = settings.IMAGE_PROXY_QUALITY[image_format][tier]
+
+    storage = storages[settings.IMAGE_PROXY_STORAGE]
+    try:
+        version = source_version(storage, path)
+    except OSError:
+        raise Http404("Image not found.")
+
+    key = f"{width}/{image_format}/{tier}/{version}/{path}"
+    etag = '"%s"' % hashlib.sha1(key.encode()).hexdigest()
+    if request.headers.get('If-None-Match') == etag:
+        return _variant_response(HttpResponseNotModified(), etag)
+
+    def render():
+        with storage.open(path, 'rb') as original:
+            return resize_image(original, width, quality=quality, format=image_format.upper())
+
+    image_cache = get_image_cache()
+    try:
+        try:
+            image_file = open(image_cache.get_or_create(key, render), 'rb')
+        except FileNotFoundError:
+            # Evicted between the lookup and the open; render it again.
+            image_file = open(image_cache.get_or_create(key, render), 'rb')
+    except OSError:
+        # Missing original, or not an image Pillow can read.
+        raise Http404("Image not found.")
+
+    response = FileResponse(image_file, content_type=IMAGE_CONTENT_TYPES[image_format])
+    return _variant_response(response, etag)
@@ -0,0 +1,112 @@
+"""
+Route-level rate limiting.
+
+RATE_LIMIT_POLICIES maps a URL name (``'live_search_api'``,
+``'limited_admin:login'``) or a path prefix (anything starting with ``/``)
+to a RateLimiter policy. The check runs in ``process_view``, so a refused
+request gets a small 429 before the view (and its queries) ever runs.
+
+Clients that the shared limiter has just refused are remembered in process
+memory until their ``retry_after`` runs out, so a flood from one address is
+turned away without even a cache round trip.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .rate_limiting import FIXED_WINDOW, RateLimiter, add_rate_limit_headers, rate_limited_response
+
+
+class PenaltyBox:
+    """
+    Per-process record of ``(policy, client) -> (blocked_until, info)``.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                return None
+            until, info = entry
+        return dict(info, retry_after=max(1, math.ceil(until - now)))
+
+    def add(self, key, until, info):
+        with self._lock:
+            self._entries[key] = (until, info)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class RateLimitMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.by_name = {}
+        self.by_prefix = []
+        for route, policy in getattr(settings, 'RATE_LIMIT_POLICIES', {}).items():
+            limiter = RateLimiter(
+                max_requests=policy['limit'],
+                window_seconds=policy['window'],
+                key_prefix=f"route:{route.strip('/').replace('/', '.') or 'root'}",
+                algorithm=policy.get('algorithm', FIXED_WINDOW),
+            )
+            methods = {method.upper() for method in policy.get('methods', ())}
+            if route.startswith('/'):
+                self.by_prefix.append((route, limiter, methods))
+            else:
+                self.by_name[route] = (limiter, methods)
+        # Longest prefix wins.
+        self.by_prefix.sort(key=lambda item: len(item[0]), reverse=True)
+        self.penalty_box = PenaltyBox(getattr(settings, 'RATE_LIMIT_PENALTY_BOX_SIZE', 10000))
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        applied = getattr(request, '_rate_limit', None)
+        if applied is not None:
+            add_rate_limit_headers(response, *applied)
+        return response
+
+    def get_policy(self, request):
+        match = request.resolver_match
+        if match is not None and match.view_name in self.by_name:
+            limiter, methods = self.by_name[match.view_name]
+        else:
+            for prefix, limiter, methods in self.by_prefix:
+                if request.path_info.startswith(prefix):
+                    break
+            else:
+                return None
+        if methods and request.method not in methods:
+            return None
+        return limiter
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        limiter = self.get_policy(request)
+        if limiter is None:
+            return None
+
+        client = limiter.get_client_ip(request)
+        penalty_key = (limiter.key_prefix, client)
+        now = time.time()
+        info = self.penalty_box.get(penalty_key, now)
+        if info is not None:
+            return rate_limited_response(limiter, info)
+
+        is_limited, info = limiter.is_rate_limited(request, client)
+        if is_limited:
+            self.penalty_box.add(penalty_key, now + info['retry_after'], info)
+            return rate_limited_response(limiter, info)
+
+        request._rate_limit = (limiter, info)
+        return None
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('akp_news', '0008_news_subcategory_alter_news_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='advertisements',
+            name='banner_image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='advertisements',
+            name='banner_image_placeholder',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Tiny inline preview shown while the image loads'),
+        ),
+        migrations.AddField(
+            model_name='advertisements',
+            name='banner_image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='featured_image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='featured_image_placeholder',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Tiny inline preview shown while the image loads'),
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='featured_image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='newshomebanner',
+            name='banner_image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='newshomebanner',
+            name='banner_image_placeholder',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Tiny inline preview shown while the image loads'),
+        ),
+        migrations.AddField(
+            model_name='newshomebanner',
+            name='banner_image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,12 +1,13 @@
 from django.db import models
 from .base import BaseModel
 from akp_accounts.models import CustomUser
-from Base.base import HomeBaseModel
+from Base.base import DirtyFieldsMixin, HomeBaseModel
 from django.utils import timezone
 from datetime import timedelta
 from django_ckeditor_5.fields import CKEditor5Field
 from django.urls import NoReverseMatch, reverse
-from Base.helpers import optimize_image
+from akp_media.jobs import enqueue_job
+from akp_media.processing import clear_image_metadata
 
 from django.core.exceptions import ValidationError
 
@@ -89,12 +90,15 @@ class NewsTag(BaseModel):
     def __str__(self):
         return self.name
 
-class News(HomeBaseModel):
+class News(DirtyFieldsMixin, HomeBaseModel):
     title = models.CharField(max_length=255)
     slug = models.SlugField(max_length=280, unique=True, help_text="Unique URL slug for the article. Use only alphanumeric characters, underscores, and hyphens. Example: 'my-article-title'.")
     content = CKEditor5Field(config_name='extends', null=True, blank=True, help_text="Content of the article.")
     summary = models.TextField(blank=True, help_text="Short summary of the article (max 200 characters)")
     featured_image = models.ImageField(upload_to='news_images_v2/', help_text="Upload a featured image for this article (Recommended size: 16:9)", null=True, blank=True)
+    featured_image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    featured_image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    featured_image_placeholder = models.TextField(blank=True, default='', editable=False, help_text="Tiny inline preview shown while the image loads")
     featured_video = models.CharField(max_length=100, null=True, blank=True, help_text="YouTube or Vimeo link for featured video (Recommended Link Format: VIDEO_ID Only)")
     
     # Publishing information
@@ -215,16 +219,13 @@ class News(HomeBaseModel):
         #     except News.DoesNotExist:
         #         pass
         # Optimize the featured image if it exists
-        try:
-            old_instance = News.objects.get(slug=self.slug)
-            image_changed = old_instance.featured_image != self.featured_image
-        except News.DoesNotExist:
-            image_changed = True
-        if image_changed and self.featured_image:
-            optimized_image = optimize_image(self.featured_image)
-            if optimized_image:
-                self.featured_image = optimized_image
+        image_changed = self.has_changed('featured_image')
+        if image_changed:
+            clear_image_metadata(self, 'featured_image')
         super().save(*args, **kwargs)
+        # Optimisation runs in run_media_worker; the upload is live until then.
+        if image_changed and self.featured_image:
+            enqueue_job('news.featured_image', self, source=self.featured_image.name)
     
 
 class ViewCountNews(BaseModel):
@@ -241,16 +242,27 @@ class ViewCountNews(BaseModel):
     def __str__(self):
         return f"Total {self.count} View count for {self.news.title}"
 
-class NewsHomeBanner(BaseModel):
+class NewsHomeBanner(DirtyFieldsMixin, BaseModel):
     banner_title = models.CharField(max_length=100, null=True, blank=True)
     banner_news = models.ForeignKey(News, on_delete=models.CASCADE, related_name='banner_news')
     banner_image = models.ImageField(upload_to='banner_images/', null=True, blank=True)
+    banner_image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    banner_image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    banner_image_placeholder = models.TextField(blank=True, default='', editable=False, help_text="Tiny inline preview shown while the image loads")
 
     is_active = models.BooleanField(default=True)
 
     def __str__(self):
         return self.banner_title
 
+    def save(self, *args, **kwargs):
+        image_changed = self.has_changed('banner_image')
+        if image_changed:
+            clear_image_metadata(self, 'banner_image')
+        super().save(*args, **kwargs)
+        if image_changed and self.banner_image:
+            enqueue_job('news.banner_image', self, source=self.banner_image.name)
+
 class NewsComment(BaseModel):
     news = models.ForeignKey(News, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='news_comments')
@@ -341,7 +353,7 @@ class SocialAccount(models.Model):
         return f"Social Accounts"
 
 
-class Advertisements(BaseModel):
+class Advertisements(DirtyFieldsMixin, BaseModel):
     BANNER_SIZES = (
         ('Home Banner 640x926', 'Home Banner 640x926'),
         ('Home Banner 2496x300', 'Home Banner 2496x300'),
@@ -350,8 +362,19 @@ class Advertisements(BaseModel):
     banner_title = models.CharField(max_length=100, null=True, blank=True)
     banner_link = models.URLField(null=True, blank=True)
     banner_image = models.ImageField(upload_to='banner_images/', null=True, blank=True)
+    banner_image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    banner_image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    banner_image_placeholder = models.TextField(blank=True, default='', editable=False, help_text="Tiny inline preview shown while the image loads")
     banner_size = models.CharField(max_length=50, null=True, blank=True, choices=BANNER_SIZES)
     is_active = models.BooleanField(default=True, null=True, blank=True)
     
     def __str__(self):
-        return self.banner_title or f"Advertisement {self.id}"
\ No newline at end of file
+        return self.banner_title or f"Advertisement {self.id}"
+
+    def save(self, *args, **kwargs):
+        image_changed = self.has_changed('banner_image')
+        if image_changed:
+            clear_image_metadata(self, 'banner_image')
+        super().save(*args, **kwargs)
+        if image_changed and self.banner_image:
+            enqueue_job('news.advertisement_image', self, source=self.banner_image.name)
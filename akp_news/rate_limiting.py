@@ -1,115 +1,236 @@
 """
 Rate limiting utilities for AKP News application
+
+Counters live in the shared cache and are only ever changed with the
+atomic ``cache.add``/``cache.incr`` primitives, so concurrent requests
+(across threads or worker processes sharing memcached) never lose a count.
+Three algorithms are available:
+
+* ``fixed_window``: one counter per window. One round trip per request.
+* ``sliding_window``: the current window's counter plus a weighted share of
+  the previous one, which smooths out bursts at window edges. Two round trips.
+* ``token_bucket``: a bucket of ``max_requests`` tokens refilled evenly over
+  ``window_seconds``, stored as a single "theoretical arrival time" (GCRA).
+  One round trip, two when the bucket was idle or the request is refused.
 """
 import hashlib
 import logging
+import math
+import re
+import time
+from datetime import datetime, timezone as dt_timezone
 from functools import wraps
 from typing import Optional
 
+from django.conf import settings
 from django.core.cache import cache
 from django.http import JsonResponse
-from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
+FIXED_WINDOW = 'fixed_window'
+SLIDING_WINDOW = 'sliding_window'
+TOKEN_BUCKET = 'token_bucket'
+
+# Identifiers that are already valid memcached keys are used as they are.
+SAFE_IDENTIFIER_RE = re.compile(r'[\w.:-]{1,64}')
+
+
+def _isoformat(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc).isoformat()
+
+
 class RateLimiter:
     """
     Rate limiting implementation using Django cache
     """
-    
-    def __init__(self, max_requests: int = 60, window_seconds: int = 60, key_prefix: str = 'rate_limit'):
+    ALGORITHMS = (FIXED_WINDOW, SLIDING_WINDOW, TOKEN_BUCKET)
+
+    def __init__(self, max_requests: int = 60, window_seconds: int = 60, key_prefix: str = 'rate_limit',
+                 algorithm: str = FIXED_WINDOW):
+        if algorithm not in self.ALGORITHMS:
+            raise ValueError(f"Unknown rate limiting algorithm '{algorithm}'")
         self.max_requests = max_requests
         self.window_seconds = window_seconds
         self.key_prefix = key_prefix
-    
+        self.algorithm = algorithm
+
     def get_client_ip(self, request) -> str:
         """
         Get client IP address from request
+
+        Only addresses written by our own proxies are trusted: the
+        RATE_LIMIT_CLIENT_IP_HEADER set by the edge (e.g. CF-Connecting-IP),
+        else the X-Forwarded-For entry appended by the outermost of the
+        RATE_LIMIT_TRUSTED_PROXIES proxies, else REMOTE_ADDR. Anything a
+        client puts further left in X-Forwarded-For is ignored.
         """
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0].strip()
-        else:
-            ip = request.META.get('REMOTE_ADDR', 'unknown')
-        return ip
-    
+        header = getattr(settings, 'RATE_LIMIT_CLIENT_IP_HEADER', '')
+        if header and request.META.get(header):
+            return request.META[header].strip()
+
+        trusted_proxies = getattr(settings, 'RATE_LIMIT_TRUSTED_PROXIES', 0)
+        if trusted_proxies:
+            forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+            if len(forwarded) >= trusted_proxies:
+                return forwarded[-trusted_proxies]
+        return request.META.get('REMOTE_ADDR', 'unknown')
+
     def get_cache_key(self, identifier: str) -> str:
         """
         Generate cache key for rate limiting
         """
-        key_hash = hashlib.md5(identifier.encode()).hexdigest()
-        return f"{self.key_prefix}:{key_hash}"
-    
+        if not SAFE_IDENTIFIER_RE.fullmatch(identifier):
+            identifier = hashlib.md5(identifier.encode()).hexdigest()
+        return f"{self.key_prefix}:{identifier}"
+
+    def _incr(self, key: str, delta: int = 1, initial: int = 0, timeout: Optional[int] = None) -> int:
+        """
+        Atomically add ``delta`` to ``key``, creating it as ``initial + delta``
+        if it doesn't exist yet.
+        """
+        try:
+            return cache.incr(key, delta)
+        except ValueError:
+            pass
+        if cache.add(key, initial + delta, timeout):
+            return initial + delta
+        # Another request created it first.
+        return cache.incr(key, delta)
+
     def is_rate_limited(self, request, identifier: Optional[str] = None) -> tuple[bool, dict]:
         """
         Check if request should be rate limited
-        
+
         Returns:
             tuple: (is_limited, info_dict)
         """
         if identifier is None:
             identifier = self.get_client_ip(request)
-        
+
         cache_key = self.get_cache_key(identifier)
-        
-        # Get current request count and timestamp
-        cache_data = cache.get(cache_key, {'count': 0, 'reset_time': timezone.now()})
-        
-        current_time = timezone.now()
-        reset_time = cache_data['reset_time']
-        
-        # Reset counter if window has passed
-        if (current_time - reset_time).total_seconds() >= self.window_seconds:
-            cache_data = {'count': 1, 'reset_time': current_time}
-            cache.set(cache_key, cache_data, self.window_seconds)
-            
+        check = getattr(self, f'_check_{self.algorithm}')
+        try:
+            is_limited, info = check(cache_key, time.time())
+        except Exception:
+            # Never take the site down with the cache: let the request through.
+            logger.exception(f"Rate limit check failed for {identifier}")
             return False, {
-                'requests_remaining': self.max_requests - 1,
-                'reset_time': current_time.isoformat(),
-                'window_seconds': self.window_seconds
+                'requests_remaining': self.max_requests,
+                'reset_time': '',
+                'window_seconds': self.window_seconds,
             }
-        
-        # Increment counter
-        cache_data['count'] += 1
-        
-        # Check if limit exceeded
-        if cache_data['count'] > self.max_requests:
-            # Update cache with current count
-            cache.set(cache_key, cache_data, self.window_seconds)
-            
-            remaining_time = self.window_seconds - (current_time - reset_time).total_seconds()
-            
+
+        info['window_seconds'] = self.window_seconds
+        if is_limited:
             logger.warning(
-                f"Rate limit exceeded for {identifier}. "
-                f"Count: {cache_data['count']}/{self.max_requests}. "
-                f"Reset in: {remaining_time:.0f}s"
+                f"Rate limit exceeded for {identifier} ({self.key_prefix}, {self.algorithm}). "
+                f"Retry in: {info['retry_after']}s"
             )
-            
+        return is_limited, info
+
+    def _check_fixed_window(self, cache_key: str, now: float) -> tuple[bool, dict]:
+        window = int(now // self.window_seconds)
+        count = self._incr(f"{cache_key}:{window}", timeout=self.window_seconds + 1)
+        reset = (window + 1) * self.window_seconds
+
+        info = {
+            'requests_remaining': max(0, self.max_requests - count),
+            'reset_time': _isoformat(reset),
+        }
+        if count > self.max_requests:
+            info['retry_after'] = max(1, math.ceil(reset - now))
+            return True, info
+        return False, info
+
+    def _check_sliding_window(self, cache_key: str, now: float) -> tuple[bool, dict]:
+        window = int(now // self.window_seconds)
+        elapsed = now - window * self.window_seconds
+        # The counter must outlive the next window, which weighs it in.
+        count = self._incr(f"{cache_key}:{window}", timeout=2 * self.window_seconds + 1)
+        previous = cache.get(f"{cache_key}:{window - 1}", 0)
+
+        previous_weight = (self.window_seconds - elapsed) / self.window_seconds
+        estimated = previous * previous_weight + count
+        reset = (window + 1) * self.window_seconds
+
+        info = {
+            'requests_remaining': max(0, int(self.max_requests - estimated)),
+            'reset_time': _isoformat(reset),
+        }
+        if estimated > self.max_requests:
+            if count < self.max_requests and previous:
+                # Wait until the previous window's share has decayed enough.
+                allowed_weight = (self.max_requests - count) / previous
+                wait = (previous_weight - allowed_weight) * self.window_seconds
+            else:
+                wait = reset - now
+            info['retry_after'] = max(1, math.ceil(wait))
+            return True, info
+        return False, info
+
+    def _check_token_bucket(self, cache_key: str, now: float) -> tuple[bool, dict]:
+        # Times are integer milliseconds so they can live in a cache counter.
+        now_ms = int(now * 1000)
+        interval = max(1, int(self.window_seconds * 1000 / self.max_requests))
+        capacity = interval * self.max_requests
+        # Longer than the bucket needs, so a busy client's state rarely expires
+        # mid-use (incr doesn't extend the timeout).
+        timeout = 10 * self.window_seconds
+        key = f"{cache_key}:tat"
+
+        tat = self._incr(key, interval, initial=now_ms, timeout=timeout)
+        if tat < now_ms + interval:
+            # The bucket was full; don't bank credit beyond its capacity.
+            tat = self._incr(key, now_ms + interval - tat, initial=now_ms, timeout=timeout)
+
+        if tat - now_ms > capacity:
+            # Give the token back; a refused request doesn't use one.
+            cache.decr(key, interval)
+            cache.touch(key, timeout)
             return True, {
                 'requests_remaining': 0,
-                'reset_time': reset_time.isoformat(),
-                'window_seconds': self.window_seconds,
-                'retry_after': max(1, int(remaining_time))
+                'reset_time': _isoformat((tat - interval) / 1000),
+                'retry_after': max(1, math.ceil((tat - capacity - now_ms) / 1000)),
             }
-        
-        # Update cache with new count
-        cache.set(cache_key, cache_data, self.window_seconds)
-        
         return False, {
-            'requests_remaining': self.max_requests - cache_data['count'],
-            'reset_time': reset_time.isoformat(),
-            'window_seconds': self.window_seconds
+            'requests_remaining': (capacity - (tat - now_ms)) // interval,
+            'reset_time': _isoformat(tat / 1000),
         }
 
 # Predefined rate limiters for different use cases
-search_rate_limiter = RateLimiter(max_requests=30, window_seconds=60, key_prefix='search_limit')
-api_rate_limiter = RateLimiter(max_requests=100, window_seconds=60, key_prefix='api_limit')
+search_rate_limiter = RateLimiter(max_requests=30, window_seconds=60, key_prefix='search_limit', algorithm=SLIDING_WINDOW)
+api_rate_limiter = RateLimiter(max_requests=100, window_seconds=60, key_prefix='api_limit', algorithm=TOKEN_BUCKET)
 strict_rate_limiter = RateLimiter(max_requests=10, window_seconds=60, key_prefix='strict_limit')
 
+def rate_limited_response(limiter: RateLimiter, info: dict) -> JsonResponse:
+    """
+    The 429 response for a refused request
+    """
+    response_data = {
+        'error': 'Rate limit exceeded',
+        'message': 'Too many requests. Please try again later.',
+        'retry_after': info.get('retry_after', 60)
+    }
+
+    response = JsonResponse(response_data, status=429)
+    response['Retry-After'] = str(info.get('retry_after', 60))
+    response['X-RateLimit-Limit'] = str(limiter.max_requests)
+    response['X-RateLimit-Remaining'] = '0'
+    response['X-RateLimit-Reset'] = info.get('reset_time', '')
+    return response
+
+def add_rate_limit_headers(response, limiter: RateLimiter, info: dict):
+    if hasattr(response, '__setitem__'):  # Check if response supports headers
+        response['X-RateLimit-Limit'] = str(limiter.max_requests)
+        response['X-RateLimit-Remaining'] = str(info.get('requests_remaining', 0))
+        response['X-RateLimit-Reset'] = info.get('reset_time', '')
+    return response
+
 def rate_limit(limiter: RateLimiter = api_rate_limiter, identifier_func=None):
     """
     Decorator for rate limiting views
-    
+
     Args:
         limiter: RateLimiter instance to use
         identifier_func: Optional function to generate custom identifier
@@ -122,35 +243,20 @@ def rate_limit(limiter: RateLimiter = api_rate_limiter, identifier_func=None):
                 identifier = identifier_func(request)
             else:
                 identifier = limiter.get_client_ip(request)
-            
+
             # Check rate limit
             is_limited, info = limiter.is_rate_limited(request, identifier)
-            
+
             if is_limited:
-                response_data = {
-                    'error': 'Rate limit exceeded',
-                    'message': 'Too many requests. Please try again later.',
-                    'retry_after': info.get('retry_after', 60)
-                }
-                
-                response = JsonResponse(response_data, status=429)
-                response['Retry-After'] = str(info.get('retry_after', 60))
-                response['X-RateLimit-Limit'] = str(limiter.max_requests)
-                response['X-RateLimit-Remaining'] = '0'
-                response['X-RateLimit-Reset'] = info.get('reset_time', '')
-                
-                return response
-            
+                return rate_limited_response(limiter, info)
+
             # Add rate limit headers to successful responses
             response = view_func(request, *args, **kwargs)
-            
-            if hasattr(response, '__setitem__'):  # Check if response supports headers
-                response['X-RateLimit-Limit'] = str(limiter.max_requests)
-                response['X-RateLimit-Remaining'] = str(info.get('requests_remaining', 0))
-                response['X-RateLimit-Reset'] = info.get('reset_time', '')
-            
+
+            add_rate_limit_headers(response, limiter, info)
+
             return response
-        
+
         return wrapper
     return decorator
 
@@ -0,0 +1,6 @@
+from akp_media.processing import register_image_task
+
+register_image_task('news.featured_image', 'akp_news.news', 'featured_image')
+# Banner artwork is served as uploaded; only its size and placeholder are recorded.
+register_image_task('news.banner_image', 'akp_news.newshomebanner', 'banner_image', optimize=False)
+register_image_task('news.advertisement_image', 'akp_news.advertisements', 'banner_image', optimize=False)
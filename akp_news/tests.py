@@ -1,3 +1,232 @@
-from django.test import TestCase
+import multiprocessing
+import threading
+import uuid
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections
+from django.http import JsonResponse
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import resolve
+
+from .middleware import RateLimitMiddleware
+from .rate_limiting import FIXED_WINDOW, SLIDING_WINDOW, TOKEN_BUCKET, RateLimiter, rate_limit
+
+
+def _hit_limiter(key_prefix, algorithm, hits, results):
+    limiter = RateLimiter(max_requests=10 ** 6, window_seconds=3600, key_prefix=key_prefix, algorithm=algorithm)
+    request = RequestFactory().get('/', REMOTE_ADDR='203.0.113.9')
+    for _ in range(hits):
+        limiter.is_rate_limited(request)
+    if results is not None:
+        results.put(hits)
+
+
+def _hits(key_prefix, algorithm, now):
+    limiter = RateLimiter(max_requests=10 ** 6, window_seconds=3600, key_prefix=key_prefix, algorithm=algorithm)
+    key = limiter.get_cache_key('203.0.113.9')
+    if algorithm == FIXED_WINDOW:
+        return cache.get(f"{key}:{int(now // 3600)}")
+    # Every allowed request moved the arrival time on by one interval.
+    interval = int(3600 * 1000 / 10 ** 6)
+    return (cache.get(f"{key}:tat") - int(now * 1000)) // interval
+
+
+def _clock(test):
+    clock = mock.patch('akp_news.rate_limiting.time.time', return_value=1_000_040.0)
+    test.addCleanup(clock.stop)
+    return clock.start()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'rate-limiter-tests'}})
+class RateLimiterTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get('/', REMOTE_ADDR='203.0.113.9')
+        self.clock = _clock(self)
+
+    def check(self, limiter, times):
+        return [limiter.is_rate_limited(self.request)[0] for _ in range(times)]
+
+    def test_fixed_window(self):
+        limiter = RateLimiter(max_requests=3, window_seconds=60, key_prefix='test_fixed', algorithm=FIXED_WINDOW)
+        self.assertEqual(self.check(limiter, 4), [False, False, False, True])
+        is_limited, info = limiter.is_rate_limited(self.request)
+        self.assertTrue(is_limited)
+        self.assertEqual(info['retry_after'], 40)
+
+        self.clock.return_value += 40
+        self.assertEqual(self.check(limiter, 1), [False])
+
+    def test_sliding_window_weighs_previous_window(self):
+        limiter = RateLimiter(max_requests=10, window_seconds=60, key_prefix='test_sliding', algorithm=SLIDING_WINDOW)
+        self.assertEqual(self.check(limiter, 10), [False] * 10)
+
+        # 15s into the next window three quarters of the previous count still
+        # counts, so only two more requests fit.
+        self.clock.return_value = 1_000_095.0
+        self.assertEqual(self.check(limiter, 3), [False, False, True])
+
+    def test_token_bucket_refills_evenly(self):
+        limiter = RateLimiter(max_requests=5, window_seconds=10, key_prefix='test_bucket', algorithm=TOKEN_BUCKET)
+        self.assertEqual(self.check(limiter, 6), [False] * 5 + [True])
+
+        # One token comes back every two seconds.
+        self.clock.return_value += 2
+        self.assertEqual(self.check(limiter, 2), [False, True])
+
+        # An idle bucket holds no more than its capacity.
+        self.clock.return_value += 3600
+        self.assertEqual(self.check(limiter, 6), [False] * 5 + [True])
+
+    def test_decorator_sets_headers(self):
+        limiter = RateLimiter(max_requests=1, window_seconds=60, key_prefix='test_decorator')
+        view = rate_limit(limiter)(lambda request: JsonResponse({}))
+        response = view(self.request)
+        self.assertEqual(response['X-RateLimit-Remaining'], '0')
+        response = view(self.request)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '40')
+
+    def test_concurrent_threads_lose_no_counts(self):
+        for algorithm in (FIXED_WINDOW, TOKEN_BUCKET):
+            prefix = f'test_threads_{algorithm}'
+            threads = [threading.Thread(target=_hit_limiter, args=(prefix, algorithm, 200, None)) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(_hits(prefix, algorithm, self.clock.return_value), 8 * 200)
+
+
+class SharedCacheRateLimiterTests(SimpleTestCase):
+    """
+    Runs against the configured shared cache (memcached), like the workers.
+    Keys are unique to the run so nothing else in the cache is touched.
+    """
+
+    def setUp(self):
+        self.clock = _clock(self)
+
+    def test_concurrent_processes_lose_no_counts(self):
+        self.assertNotIsInstance(caches['default'], LocMemCache)
+
+        ctx = multiprocessing.get_context('fork')
+        for algorithm in (FIXED_WINDOW, TOKEN_BUCKET):
+            prefix = f'test_processes_{algorithm}_{uuid.uuid4().hex}'
+            results = ctx.Queue()
+            # Each child must open its own connections, not share the parent's sockets.
+            connections.close_all()
+            caches.close_all()
+            workers = [ctx.Process(target=_hit_limiter, args=(prefix, algorithm, 200, results)) for _ in range(4)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            self.assertEqual(sum(results.get() for _ in workers), 4 * 200)
+            self.assertEqual(_hits(prefix, algorithm, self.clock.return_value), 4 * 200)
+
+
+class ClientIpTests(SimpleTestCase):
+
+    def setUp(self):
+        self.limiter = RateLimiter()
+
+    def client_ip(self, **meta):
+        return self.limiter.get_client_ip(RequestFactory().get('/', REMOTE_ADDR='10.0.0.2', **meta))
+
+    @override_settings(RATE_LIMIT_TRUSTED_PROXIES=1, RATE_LIMIT_CLIENT_IP_HEADER='')
+    def test_uses_the_entry_added_by_the_trusted_proxy(self):
+        self.assertEqual(self.client_ip(HTTP_X_FORWARDED_FOR='1.2.3.4, 203.0.113.9'), '203.0.113.9')
+        self.assertEqual(self.client_ip(HTTP_X_FORWARDED_FOR='203.0.113.9'), '203.0.113.9')
+
+    @override_settings(RATE_LIMIT_TRUSTED_PROXIES=2, RATE_LIMIT_CLIENT_IP_HEADER='')
+    def test_skips_the_inner_proxies(self):
+        self.assertEqual(self.client_ip(HTTP_X_FORWARDED_FOR='1.2.3.4, 203.0.113.9, 198.51.100.1'), '203.0.113.9')
+        # Fewer entries than proxies: the request didn't come through them all.
+        self.assertEqual(self.client_ip(HTTP_X_FORWARDED_FOR='203.0.113.9'), '10.0.0.2')
+
+    @override_settings(RATE_LIMIT_TRUSTED_PROXIES=0, RATE_LIMIT_CLIENT_IP_HEADER='')
+    def test_ignores_forwarded_for_without_proxies(self):
+        self.assertEqual(self.client_ip(HTTP_X_FORWARDED_FOR='1.2.3.4'), '10.0.0.2')
+
+    @override_settings(RATE_LIMIT_TRUSTED_PROXIES=1, RATE_LIMIT_CLIENT_IP_HEADER='HTTP_CF_CONNECTING_IP')
+    def test_edge_header_wins(self):
+        self.assertEqual(
+            self.client_ip(HTTP_CF_CONNECTING_IP='203.0.113.9', HTTP_X_FORWARDED_FOR='1.2.3.4, 198.51.100.1'),
+            '203.0.113.9',
+        )
+        self.assertEqual(self.client_ip(HTTP_X_FORWARDED_FOR='1.2.3.4, 198.51.100.1'), '198.51.100.1')
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'rate-limit-middleware-tests'}},
+    RATE_LIMIT_TRUSTED_PROXIES=0,
+    RATE_LIMIT_CLIENT_IP_HEADER='',
+    RATE_LIMIT_POLICIES={
+        'live_search_api': {'limit': 2, 'window': 60},
+        'add_comment': {'limit': 1, 'window': 60, 'methods': ['POST']},
+        '/epapers/': {'limit': 5, 'window': 60},
+        '/epapers/archive/': {'limit': 1, 'window': 60},
+    },
+)
+class RateLimitMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.middleware = RateLimitMiddleware(lambda request: HttpResponse('ok'))
+
+    def request(self, path, method='get'):
+        request = getattr(RequestFactory(), method)(path, REMOTE_ADDR='203.0.113.9')
+        request.resolver_match = resolve(path)
+        return request
+
+    def call(self, path, method='get'):
+        request = self.request(path, method)
+        response = self.middleware.process_view(request, request.resolver_match.func, (), {})
+        return response or self.middleware(request)
+
+    def test_policy_lookup(self):
+        policy = self.middleware.get_policy
+        # A URL name beats any path prefix.
+        self.assertEqual(policy(self.request('/api/live-search/')).key_prefix, 'route:live_search_api')
+        # The longest matching prefix wins.
+        self.assertEqual(policy(self.request('/epapers/archive/')).key_prefix, 'route:epapers.archive')
+        self.assertEqual(policy(self.request('/epapers/search/')).key_prefix, 'route:epapers')
+        self.assertIsNone(policy(self.request('/')))
+
+    def test_methods_filter(self):
+        self.assertIsNone(self.middleware.get_policy(self.request('/add-comment/')))
+        self.assertEqual(self.middleware.get_policy(self.request('/add-comment/', 'post')).key_prefix, 'route:add_comment')
+
+    def test_limits_and_sets_headers(self):
+        response = self.call('/api/live-search/')
+        self.assertEqual(response.content, b'ok')
+        self.assertEqual(response['X-RateLimit-Limit'], '2')
+        self.assertEqual(response['X-RateLimit-Remaining'], '1')
+        self.call('/api/live-search/')
+        response = self.call('/api/live-search/')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        # Unlimited routes are left alone.
+        self.assertNotIn('X-RateLimit-Limit', self.call('/'))
+
+    def test_penalty_box_answers_without_the_cache(self):
+        self.call('/api/live-search/')
+        self.call('/api/live-search/')
+        self.assertEqual(self.call('/api/live-search/').status_code, 429)
+
+        limiter = self.middleware.by_name['live_search_api'][0]
+        with mock.patch.object(limiter, 'is_rate_limited', wraps=limiter.is_rate_limited) as check:
+            self.assertEqual(self.call('/api/live-search/').status_code, 429)
+        check.assert_not_called()
+
+    def test_penalty_box_expires(self):
+        with mock.patch('akp_news.middleware.time.time', return_value=1_000_000.0) as clock:
+            self.middleware.penalty_box.add(('route:live_search_api', '203.0.113.9'), 1_000_010.0, {'reset_time': ''})
+            self.assertEqual(self.call('/api/live-search/')['Retry-After'], '10')
+            clock.return_value += 10
+            self.assertEqual(self.call('/api/live-search/').status_code, 200)
@@ -7,10 +7,11 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 from django.views.generic import ListView
-from akp_epapers.models import Epaper
+from django.conf import settings
+from akp_epapers.archive import latest_epapers
 from .search import perform_search
 
-from webstories.models import WebStory
+from webstories.rail import story_rail
 
 from django.core.cache import cache
 # Create your views here.
@@ -70,7 +71,7 @@ def index_akp_news(request):
     home_banner_640_last = get_random_ad_for_size('Home Banner 640x926')
     home_banner_2496 = get_random_ad_for_size('Home Banner 2496x300')
 
-    stories = WebStory.objects.filter(is_active=True).order_by('-created_at')
+    stories = story_rail()
 
     context = {
         'news_tags': news_tags,
@@ -87,7 +88,8 @@ def index_akp_news(request):
         'technology_news': technology_news,
         'business_news': business_news,
         'entertainment_news': entertainment_news,
-        'stories': stories,
+        'stories': stories['stories'],
+        'stories_next_offset': stories['next_offset'],
     }
 
     return render(request, template_name='base/index.html', context=context)
@@ -255,12 +257,13 @@ def category_details(request, slug):
 
     about_us = AboutUs.objects.all()  # Assuming you have a single AboutUs object
 
-    epapers = Epaper.objects.filter(is_active=True).order_by('-timestamp')
+    epapers = latest_epapers(settings.EPAPER_SIDEBAR_COUNT)
 
     context = {
         'category': category,
         'about_us': about_us,
-        'epapers': epapers
+        'epapers': epapers,
+        'epaper_download_limit': settings.EPAPER_DOWNLOAD_LIMIT,
     }
     return render(request, template_name='news/details/category_details.html', context=context)
 
@@ -57,6 +57,7 @@ INSTALLED_APPS = [
     "admin_akp",
     "webstories",
     "settings",
+    "akp_media",
 
     # import-export
     'import_export',
@@ -70,8 +71,94 @@ AUTH_USER_MODEL = 'akp_accounts.CustomUser'
 MAX_ADMIN_CONCURRENT_SESSIONS = 50
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 
+# Sessions: cached_db with a per-process L1 (see akp_accounts/sessions.py).
+# Expired rows are removed by `python manage.py purge_sessions`.
+SESSION_ENGINE = "akp_accounts.sessions"
+SESSION_LOCAL_CACHE_TIMEOUT = 5  # seconds a session may be served from process memory
+SESSION_LOCAL_CACHE_SIZE = 10000
+SESSION_EXPIRY_WRITE_GRACE = 5 * 60  # skip saves that would only move the expiry by less than this
+
+# Media processing queue (see `python manage.py run_media_worker`)
+MEDIA_WORKER_PROCESSES = 2
+MEDIA_JOB_MAX_ATTEMPTS = 5
+MEDIA_JOB_RETRY_DELAY = 30  # seconds, doubled on every retry
+MEDIA_JOB_LEASE_SECONDS = 600  # a running job is reclaimed after this long
+# Large files (e-paper PDFs) on R2 are handed out as presigned URLs valid this long (seconds)
+MEDIA_REDIRECT_URL_EXPIRY = 10 * 60
+
+# E-paper viewer renditions: each page is rendered at these widths (px); the
+# largest is cut into tiles of EPAPER_PAGE_TILE_SIZE px (0 stores it whole).
+EPAPER_PAGE_WIDTHS = (480, 1200, 2400)
+EPAPER_PAGE_TILE_SIZE = 512
+EPAPER_PAGE_QUALITY = 75
+EPAPER_RENDER_PROCESSES = None  # defaults to the number of CPU cores
+# Signed page-image URLs are cached per e-paper this long and signed for twice as long
+EPAPER_PAGE_URL_CACHE_TIMEOUT = 60 * 60 * 12
+# Optimise uploaded PDFs before serving them: images above the threshold DPI
+# are downsampled to EPAPER_PDF_IMAGE_DPI and all streams are recompressed.
+EPAPER_PDF_OPTIMIZE = True
+EPAPER_PDF_IMAGE_DPI = 150
+EPAPER_PDF_IMAGE_DPI_THRESHOLD = 200
+EPAPER_PDF_IMAGE_QUALITY = 75
+
+EPAPER_DOWNLOAD_LIMIT = 365
+# Download audit rows are buffered per process and bulk-inserted this often (seconds)
+EPAPER_DOWNLOAD_FLUSH_INTERVAL = 5
+EPAPER_DOWNLOAD_BUFFER_SIZE = 200  # flush early once this many are waiting
+
+# /s/<code>/ targets are cached per worker (LRU) and in the shared cache
+SHORT_URL_LRU_SIZE = 10000
+SHORT_URL_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
+# Archive index of active e-papers (dropped on every change; the timeout is a safety net)
+EPAPER_ARCHIVE_CACHE_TIMEOUT = 60 * 60
+EPAPER_ARCHIVE_PAGE_SIZE = 24
+EPAPER_SIDEBAR_COUNT = 12  # latest e-papers listed on the e-paper category page
+
+# Absolute URLs in pages rendered outside a request (pre-rendered web stories)
+SITE_URL = "https://aajkaprahari.com"
+
+# Web stories are pre-rendered to HTML and AMP pages whenever they change
+WEBSTORY_SLIDE_WIDTH = 800
+WEBSTORY_COVER_WIDTH = 320
+WEBSTORY_PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+WEBSTORY_ZIP_MAX_BYTES = 200 * 1024 * 1024  # uncompressed images in one bulk-upload ZIP
+# Homepage story rail: stories per page, and how long a page is cached
+WEBSTORY_RAIL_SIZE = 12
+WEBSTORY_RAIL_MAX_OFFSET = 20 * WEBSTORY_RAIL_SIZE  # how far back the rail pages
+WEBSTORY_RAIL_CACHE_TIMEOUT = 60 * 60
+
+# On-demand image resizing (/img/<width>/<path>)
+IMAGE_PROXY_WIDTHS = (160, 320, 480, 640, 800, 1000, 1280)
+IMAGE_PROXY_PREFIXES = (
+    'news_images/',
+    'news_images_v2/',
+    'banner_images/',
+    'profile_images/',
+    'webstories_v2/',
+    'meta_images/',
+)
+IMAGE_PROXY_STORAGE = 'default'  # any alias in STORAGES; tests can point this at a FileSystemStorage
+IMAGE_PROXY_CACHE_DIR = os.path.join(BASE_DIR, '.image_cache')
+IMAGE_PROXY_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Renditions are keyed by the original's size and mtime, checked this often;
+# clients revalidate them (cheap 304s) after IMAGE_PROXY_MAX_AGE.
+IMAGE_PROXY_SOURCE_CHECK_SECONDS = 5 * 60
+IMAGE_PROXY_MAX_AGE = 60 * 60 * 24
+# Formats in order of preference; each is served only if the client's Accept
+# header lists it, and JPEG is the fallback for everything else.
+IMAGE_PROXY_FORMATS = ('avif', 'webp', 'jpeg')
+# Encoder quality per format: 'full' by default, 'lite' for Save-Data or a slow ECT.
+IMAGE_PROXY_QUALITY = {
+    'avif': {'full': 55, 'lite': 35},
+    'webp': {'full': 80, 'lite': 55},
+    'jpeg': {'full': 82, 'lite': 60},
+}
+IMAGE_PROXY_SLOW_ECT = ('slow-2g', '2g', '3g')
+
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "akp_news.middleware.RateLimitMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -86,6 +173,29 @@ MIDDLEWARE = [
     'allauth.account.middleware.AccountMiddleware',
 ]
 
+# AdminConcurrentLoginMiddleware policy
+ADMIN_MAX_SESSIONS_PER_USER = 2
+ADMIN_SESSION_IDLE_TIMEOUT = 30 * 60  # seconds without a request before a session stops counting
+ADMIN_SESSION_ACTIVITY_INTERVAL = 60  # refresh a session's last activity at most this often
+
+# RateLimitMiddleware policies, keyed by URL name or by path prefix (starting
+# with "/"). "methods" limits a policy to those methods; "algorithm" is one of
+# fixed_window, sliding_window, token_bucket (see akp_news/rate_limiting.py).
+RATE_LIMIT_POLICIES = {
+    'live_search_api': {'limit': 30, 'window': 60, 'algorithm': 'sliding_window'},
+    'add_comment': {'limit': 5, 'window': 60, 'methods': ['POST']},
+    'login': {'limit': 10, 'window': 5 * 60, 'methods': ['POST']},
+    'limited_admin:login': {'limit': 10, 'window': 5 * 60, 'methods': ['POST']},
+    'register': {'limit': 5, 'window': 60 * 60, 'methods': ['POST']},
+    'newsletter_subscribers': {'limit': 5, 'window': 60 * 60, 'methods': ['POST']},
+}
+RATE_LIMIT_PENALTY_BOX_SIZE = 10000  # refused clients remembered per process
+# How clients are identified behind the proxies: the number of proxies that
+# append to X-Forwarded-For (the entry the outermost one added is used), or
+# a header set by the edge that overrides it, e.g. HTTP_CF_CONNECTING_IP.
+RATE_LIMIT_TRUSTED_PROXIES = config('RATE_LIMIT_TRUSTED_PROXIES', default=1, cast=int)
+RATE_LIMIT_CLIENT_IP_HEADER = config('RATE_LIMIT_CLIENT_IP_HEADER', default='')
+
 ROOT_URLCONF = "akp_server.urls"
 
 TEMPLATES = [
@@ -110,13 +220,16 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "akp_server.wsgi.application"
 
-# CACHES = {
-#     'default': {
-#         'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
-#         'LOCATION': '127.0.0.1:11211',
-#         'TIMEOUT': 600, # Default cache timeout in seconds (10 minutes)
-#     }
-# }
+# The cache must be shared by every gunicorn worker and run_media_worker:
+# sessions, rate limits and the page caches are invalidated from whichever
+# process made the change (a system check refuses a per-process cache).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': config('MEMCACHED_LOCATION', default='127.0.0.1:11211'),
+        'TIMEOUT': 600, # Default cache timeout in seconds (10 minutes)
+    }
+}
 
 
 DATABASES = {
@@ -291,6 +404,17 @@ EMAIL_USE_TLS = config('EMAIL_USE_TLS', cast=bool)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 
+# Outbox delivered by `python manage.py send_outbox`
+EMAIL_OUTBOX_BATCH_SIZE = 50  # emails sent per connection
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 60  # seconds, doubled on every retry
+EMAIL_OUTBOX_LEASE_SECONDS = 300  # a batch still marked sending is reclaimed after this long
+
+# Newsletter issues are sent by run_media_worker (see akp_accounts/newsletter.py)
+NEWSLETTER_CHUNK_SIZE = 100  # recipients claimed and recorded together
+NEWSLETTER_MAX_ATTEMPTS = 3  # per recipient
+NEWSLETTER_DELIVERY_LEASE_SECONDS = 600
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
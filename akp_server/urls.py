@@ -4,11 +4,12 @@ from django.conf import settings
 # from django.conf.urls.static import static
 # from django.contrib.staticfiles.urls import staticfiles_urlpatterns
 
-from akp_epapers.views import download_epaper_view, view_epaper, redirect_short_url
+from akp_epapers.views import download_epaper_view, epaper_archive_view, epaper_calendar_api, epaper_pdf_view, epaper_search_api, view_epaper, redirect_short_url
 from akp_accounts.admin import limited_admin_site
 
 from akp_news import views as server_views
-from webstories.views import story_detail
+from webstories.views import story_amp, story_detail, story_manifest_view, story_rail_api
+from akp_media.views import resized_image
 
 from akp_news.sitemaps import NewsSitemap, NewsCategorySitemap, NewsTagSitemap, HomeSitemap
 from django.contrib.sitemaps.views import sitemap
@@ -32,9 +33,17 @@ urlpatterns = [
     path("control-admin-center/", include("admin_akp.urls")),
     path('ckeditor5/', include('django_ckeditor_5.urls')),
     path("s/<str:short_url>/", redirect_short_url, name="redirect_short_url"),
+    path("visualstories/rail/", story_rail_api, name="story_rail"),
     path("visualstories/<str:slug>/", story_detail, name="story_detail"),
+    path("visualstories/<str:slug>/amp/", story_amp, name="story_amp"),
+    path("visualstories/<str:slug>/manifest/", story_manifest_view, name="story_manifest"),
+    path("epapers/search/", epaper_search_api, name="epaper_search"),
+    path("epapers/archive/", epaper_archive_view, name="epaper_archive"),
+    path("epapers/calendar/", epaper_calendar_api, name="epaper_calendar"),
     path("epapers/<str:epaper_id>/", view_epaper, name="view_epaper"),
+    path("epapers/<str:epaper_id>/pdf/", epaper_pdf_view, name="epaper_pdf"),
     path("pdf/<str:epaper_id>/download/", download_epaper_view, name="download_epaper"),
+    path("img/<int:width>/<path:path>", resized_image, name="resized_image"),
 ]
 
 urlpatterns += [
@@ -1,4 +1,10 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from .forms import WebStoryBulkUploadForm
+from .ingest import ingest_story, natural_key, read_zip_slides
 from .models import WebStory, WebStorySlide
 from akp_accounts.admin import limited_admin_site
 # Register your models here.
@@ -16,5 +22,51 @@ class WebStoryAdmin(admin.ModelAdmin):
     search_fields = ('title', 'slug')
     inlines = [WebStorySlideInline]
     readonly_fields = ('created_at', 'updated_at')
+    change_list_template = 'admin/webstories/webstory/change_list.html'
 
-limited_admin_site.register(WebStory, WebStoryAdmin)
\ No newline at end of file
+    def get_urls(self):
+        urls = [
+            path(
+                'bulk-upload/',
+                self.admin_site.admin_view(self.bulk_upload_view),
+                name='webstories_webstory_bulk_upload',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def bulk_upload_view(self, request):
+        request.current_app = self.admin_site.name
+        if not self.has_add_permission(request):
+            return redirect(reverse(f'{self.admin_site.name}:index'))
+
+        form = WebStoryBulkUploadForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            try:
+                if form.cleaned_data['archive']:
+                    slide_files = read_zip_slides(form.cleaned_data['archive'])
+                else:
+                    slide_files = sorted(
+                        ((f.name, f.read()) for f in form.cleaned_data['images']),
+                        key=lambda slide: natural_key(slide[0]),
+                    )
+                story = ingest_story(
+                    form.cleaned_data['title'],
+                    slide_files,
+                    captions=form.get_captions(),
+                    is_active=form.cleaned_data['is_active'],
+                )
+            except (ValueError, ValidationError) as e:
+                form.add_error(None, e)
+            else:
+                self.message_user(request, f"Web story '{story.title}' created with {len(slide_files)} slides.", messages.SUCCESS)
+                return redirect(reverse(f'{self.admin_site.name}:webstories_webstory_change', args=[story.pk]))
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Bulk upload web story',
+            'opts': self.model._meta,
+            'form': form,
+        }
+        return TemplateResponse(request, 'admin/webstories/webstory/bulk_upload.html', context)
+
+limited_admin_site.register(WebStory, WebStoryAdmin)
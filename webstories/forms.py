@@ -0,0 +1,34 @@
+from django import forms
+
+
+class MultipleFileInput(forms.ClearableFileInput):
+    allow_multiple_selected = True
+
+
+class MultipleFileField(forms.FileField):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("widget", MultipleFileInput())
+        super().__init__(*args, **kwargs)
+
+    def clean(self, data, initial=None):
+        single_file_clean = super().clean
+        if isinstance(data, (list, tuple)):
+            return [single_file_clean(d, initial) for d in data]
+        return [single_file_clean(data, initial)] if data else []
+
+
+class WebStoryBulkUploadForm(forms.Form):
+    title = forms.CharField(max_length=255)
+    archive = forms.FileField(required=False, help_text="ZIP of slide images. Slides are ordered by filename.")
+    images = MultipleFileField(required=False, help_text="Or select the slide images directly. Slides are ordered by filename.")
+    captions = forms.CharField(widget=forms.Textarea, required=False, help_text="Optional. One caption per line, in slide order.")
+    is_active = forms.BooleanField(initial=True, required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('archive') and not cleaned_data.get('images'):
+            raise forms.ValidationError("Upload a ZIP archive or select the slide images.")
+        return cleaned_data
+
+    def get_captions(self):
+        return self.cleaned_data.get('captions', '').splitlines()
@@ -0,0 +1,110 @@
+"""
+Bulk creation of a web story from a batch of slide images.
+
+Slides are decoded and re-encoded in parallel on a process pool, uploaded to
+storage from a thread pool, and inserted with a single ``bulk_create``, so a
+story takes roughly as long as its slowest slide instead of the sum of all.
+"""
+import os
+import re
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+from Base.helpers import encode_image_bytes
+from .models import WebStory, WebStorySlide
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+def natural_key(name):
+    # slide-2.jpg sorts before slide-10.jpg
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', name)]
+
+
+def read_zip_slides(fileobj):
+    """
+    Return ``[(name, bytes), ...]`` for the images in a ZIP, in filename order.
+    Raises ValueError if the file isn't a readable ZIP or its images would
+    inflate to more than WEBSTORY_ZIP_MAX_BYTES.
+    """
+    budget = getattr(settings, 'WEBSTORY_ZIP_MAX_BYTES', 200 * 1024 * 1024)
+    slides = []
+    try:
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                name = os.path.basename(info.filename)
+                if info.is_dir() or name.startswith('.') or not name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                # The sizes in the directory can lie; stop reading past the budget.
+                with archive.open(info) as member:
+                    data = member.read(budget + 1)
+                budget -= len(data)
+                if budget < 0:
+                    raise ValueError("The ZIP archive's images are too large once uncompressed.")
+                slides.append((name, data))
+    except (zipfile.BadZipFile, zlib.error, EOFError, RuntimeError, NotImplementedError) as e:
+        raise ValueError(f"The file is not a readable ZIP archive ({e}).")
+    return sorted(slides, key=lambda slide: natural_key(slide[0]))
+
+
+def _upload(field, instance, name, data):
+    return field.storage.save(field.generate_filename(instance, name), ContentFile(data))
+
+
+def ingest_story(title, slide_files, captions=None, is_active=True, max_workers=None):
+    """
+    Create a WebStory with one ordered slide per ``(name, bytes)`` in
+    ``slide_files``. The first slide doubles as the cover image.
+    """
+    if not slide_files:
+        raise ValueError("A web story needs at least one slide.")
+    captions = list(captions or [])
+
+    # Validate before spending CPU on encoding.
+    story = WebStory(title=title, is_active=is_active)
+    slides = []
+    for index in range(len(slide_files)):
+        caption = captions[index] if index < len(captions) else None
+        slide = WebStorySlide(story=story, order=index + 1, caption=caption or None)
+        slide.clean()
+        slides.append(slide)
+
+    workers = min(len(slide_files), max_workers or os.cpu_count() or 1)
+    names, blobs = zip(*slide_files)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        encoded = list(pool.map(encode_image_bytes, names, blobs))
+
+    image_field = WebStorySlide._meta.get_field('image')
+    with ThreadPoolExecutor(max_workers=min(len(encoded), 8)) as uploads:
+        stored_names = list(uploads.map(
+            lambda item: _upload(image_field, slides[0], item[0], item[1]), encoded
+        ))
+
+    with transaction.atomic():
+        story.save()
+        for slide, stored_name, (name, data, metadata) in zip(slides, stored_names, encoded):
+            slide.story = story
+            slide.image = stored_name
+            slide.image_width = metadata['width']
+            slide.image_height = metadata['height']
+            slide.image_placeholder = metadata['placeholder']
+        WebStorySlide.objects.bulk_create(slides)
+
+        # The first slide is already optimised; pointing the cover at it with
+        # an UPDATE avoids a second upload and a redundant media job.
+        cover = {
+            'cover_image': stored_names[0],
+            'cover_image_width': slides[0].image_width,
+            'cover_image_height': slides[0].image_height,
+            'cover_image_placeholder': slides[0].image_placeholder,
+        }
+        WebStory.objects.filter(pk=story.pk).update(**cover)
+        for field_name, value in cover.items():
+            setattr(story, field_name, value)
+
+    return story
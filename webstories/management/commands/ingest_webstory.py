@@ -0,0 +1,89 @@
+"""
+Management command to create a web story from a ZIP or a list of slide images
+"""
+import os
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from webstories.ingest import IMAGE_EXTENSIONS, ingest_story, natural_key, read_zip_slides
+
+
+class Command(BaseCommand):
+    help = 'Create a web story with ordered slides from a ZIP archive, a directory or image files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('title', help='Title of the web story')
+        parser.add_argument('sources', nargs='+', help='A ZIP archive, a directory, or image files in slide order')
+        parser.add_argument(
+            '--captions-file',
+            help='Text file with one caption per line, in slide order',
+        )
+        parser.add_argument(
+            '--inactive',
+            action='store_true',
+            help='Create the story unpublished',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Encoding processes (defaults to the number of CPU cores)',
+        )
+
+    def handle(self, *args, **options):
+        slide_files = self.collect_slides(options['sources'])
+
+        captions = []
+        if options['captions_file']:
+            with open(options['captions_file'], encoding='utf-8') as captions_file:
+                captions = captions_file.read().splitlines()
+
+        started = time.monotonic()
+        try:
+            story = ingest_story(
+                options['title'],
+                slide_files,
+                captions=captions,
+                is_active=not options['inactive'],
+                max_workers=options['workers'],
+            )
+        except (ValueError, ValidationError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ Created web story '{story.title}' ({story.slug}) with {len(slide_files)} slides "
+                f"in {time.monotonic() - started:.1f}s"
+            )
+        )
+
+    def collect_slides(self, sources):
+        if len(sources) == 1 and sources[0].lower().endswith('.zip'):
+            with open(sources[0], 'rb') as archive:
+                try:
+                    return read_zip_slides(archive)
+                except ValueError as e:
+                    raise CommandError(f"{sources[0]}: {e}")
+
+        paths = []
+        for source in sources:
+            if os.path.isdir(source):
+                paths.extend(
+                    sorted(
+                        (os.path.join(source, name) for name in os.listdir(source)
+                         if name.lower().endswith(IMAGE_EXTENSIONS)),
+                        key=lambda p: natural_key(os.path.basename(p)),
+                    )
+                )
+            elif os.path.isfile(source):
+                paths.append(source)
+            else:
+                raise CommandError(f"{source} does not exist")
+
+        slide_files = []
+        for path in paths:
+            with open(path, 'rb') as image_file:
+                slide_files.append((os.path.basename(path), image_file.read()))
+        return slide_files
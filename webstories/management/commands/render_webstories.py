@@ -0,0 +1,39 @@
+"""
+Management command to queue pre-rendering for web stories whose stored
+pages are missing or out of date
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from django.utils import timezone
+
+from akp_media.jobs import job_object_id
+from akp_media.models import MediaJob
+from webstories.models import WebStory
+
+
+class Command(BaseCommand):
+    help = 'Queue HTML/AMP rendering for every web story without current pre-rendered pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Re-render every story, e.g. after a template change',
+        )
+
+    def handle(self, *args, **options):
+        stories = WebStory.objects.all()
+        if not options['all']:
+            stories = stories.filter(Q(rendered_version__isnull=True) | ~Q(rendered_version=F('content_version')))
+
+        now = timezone.now()
+        jobs = [
+            MediaJob(task='webstories.render_pages', model_label='webstories.webstory', object_id=job_object_id(WebStory, pk), run_after=now)
+            for pk in stories.values_list('pk', flat=True).iterator()
+        ]
+        # Stories that already have a pending job are skipped by the unique constraint.
+        MediaJob.objects.bulk_create(jobs, batch_size=500, ignore_conflicts=True)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Queued {len(jobs)} web story(ies); run_media_worker will render them')
+        )
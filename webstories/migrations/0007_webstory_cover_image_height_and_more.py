@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webstories', '0006_alter_webstory_slug_alter_webstoryslide_caption'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webstory',
+            name='cover_image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='webstory',
+            name='cover_image_placeholder',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Tiny inline preview shown while the image loads'),
+        ),
+        migrations.AddField(
+            model_name='webstory',
+            name='cover_image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='webstoryslide',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='webstoryslide',
+            name='image_placeholder',
+            field=models.TextField(blank=True, default='', editable=False, help_text='Tiny inline preview shown while the image loads'),
+        ),
+        migrations.AddField(
+            model_name='webstoryslide',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
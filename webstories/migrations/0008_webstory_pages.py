@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webstories', '0007_webstory_cover_image_height_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webstory',
+            name='content_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='webstory',
+            name='page_amp',
+            field=models.FileField(blank=True, editable=False, null=True, upload_to='webstories_pages/'),
+        ),
+        migrations.AddField(
+            model_name='webstory',
+            name='page_html',
+            field=models.FileField(blank=True, editable=False, null=True, upload_to='webstories_pages/'),
+        ),
+        migrations.AddField(
+            model_name='webstory',
+            name='rendered_version',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webstories', '0008_webstory_pages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webstory',
+            name='manifest',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
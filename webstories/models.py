@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 import string
 import random
 
@@ -7,14 +7,42 @@ from PIL import Image
 from io import BytesIO
 import os
 
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.db.models import F
 
-from Base.helpers import optimize_image
+from akp_media.jobs import enqueue_job
+from akp_media.processing import clear_image_metadata
+from Base.base import DirtyFieldsMixin
 
 def get_short_id():
   characters = string.ascii_letters + string.digits
   return ''.join(random.choice(characters) for _ in range(15))
 
+def story_cache_key(slug, entry):
+  return f'webstory:{slug}:{entry}'
+
+RAIL_VERSION_KEY = 'webstory_rail:version'
+
+def rail_version():
+  version = cache.get(RAIL_VERSION_KEY)
+  if version is None:
+    cache.add(RAIL_VERSION_KEY, 1, None)
+    version = cache.get(RAIL_VERSION_KEY, 1)
+  return version
+
+def _incr_rail_version():
+  try:
+    cache.incr(RAIL_VERSION_KEY)
+  except ValueError:
+    cache.set(RAIL_VERSION_KEY, rail_version() + 1, None)
+
+def bump_rail_version():
+  # The cached rail pages are keyed by this version (in the shared cache, so
+  # every worker sees the bump); bumping it retires them. It waits for the
+  # commit, so no worker can re-cache the old rows under the new version.
+  transaction.on_commit(_incr_rail_version)
+
 class WebBaseModel(models.Model):
   created_at = models.DateTimeField(auto_now_add=True)
   updated_at = models.DateTimeField(auto_now=True)
@@ -22,11 +50,29 @@ class WebBaseModel(models.Model):
   class Meta:
     abstract = True
 
-class WebStory(WebBaseModel):
+class WebStory(DirtyFieldsMixin, WebBaseModel):
     title = models.CharField(max_length=255, null=True, blank=True)
     slug = models.SlugField(max_length=20, default=get_short_id, editable=False, unique=True)
     cover_image = models.ImageField(upload_to='webstories_v2/cover_images/', null=True, blank=True, help_text="Cover Image. Recommended size: 600x800px. Portrait Image.",)
+    cover_image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    cover_image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    cover_image_placeholder = models.TextField(blank=True, default='', editable=False, help_text="Tiny inline preview shown while the image loads")
     is_active = models.BooleanField(default=True)
+    # Bumped on every change to the story or its slides; the pre-rendered
+    # pages below are current when rendered_version matches it.
+    content_version = models.PositiveIntegerField(default=0, editable=False)
+    rendered_version = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    page_html = models.FileField(upload_to='webstories_pages/', null=True, blank=True, editable=False)
+    page_amp = models.FileField(upload_to='webstories_pages/', null=True, blank=True, editable=False)
+    # Slide images, captions and the next stories, for preloading
+    manifest = models.JSONField(null=True, blank=True, editable=False)
+
+    PAGE_VARIANTS = ('html', 'amp')
+    # Only ever changed by UPDATEs (mark_changed's F() increment, the render
+    # and cover image jobs); an ordinary save of a stale instance must not
+    # write them back.
+    RENDER_FIELDS = ('content_version', 'rendered_version', 'page_html', 'page_amp', 'manifest')
+    COVER_METADATA_FIELDS = ('cover_image_width', 'cover_image_height', 'cover_image_placeholder')
 
     class Meta:
         verbose_name = "Web Story"
@@ -54,21 +100,44 @@ class WebStory(WebBaseModel):
         #     optimized_image = optimize_image(self.cover_image)
         #     if optimized_image:
         #         self.cover_image = optimized_image
-        try:
-            old_instance = WebStory.objects.get(pk=self.pk)
-            image_changed = old_instance.cover_image != self.cover_image
-        except WebStory.DoesNotExist:
-            image_changed = True
-        if image_changed and self.cover_image:
-            optimized_image = optimize_image(self.cover_image)
-            if optimized_image:
-                self.cover_image = optimized_image
+        image_changed = self.has_changed('cover_image')
+        if image_changed:
+            clear_image_metadata(self, 'cover_image')
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skipped = self.RENDER_FIELDS + (() if image_changed else self.COVER_METADATA_FIELDS)
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped
+            ]
         super().save(*args, **kwargs)
+        if image_changed and self.cover_image:
+            enqueue_job('webstories.cover_image', self, source=self.cover_image.name)
+        self.mark_changed(neighbours=True)
+
+    def newer_neighbours(self):
+        # The stories whose manifests list this one as up next
+        return WebStory.objects.filter(is_active=True, created_at__gt=self.created_at).order_by('created_at')[:2]
 
-class WebStorySlide(WebBaseModel):
+    def mark_changed(self, neighbours=False):
+        """
+        Drop the cached pages and queue a re-render; until it has run, the
+        story is rendered per request. With ``neighbours``, the stories that
+        link to this one as up next are re-rendered too.
+        """
+        stories = [self] + (list(self.newer_neighbours()) if neighbours else [])
+        WebStory.objects.filter(pk__in=[story.pk for story in stories]).update(content_version=F('content_version') + 1)
+        cache.delete_many([story_cache_key(story.slug, entry) for story in stories for entry in self.PAGE_VARIANTS])
+        bump_rail_version()
+        for story in stories:
+            enqueue_job('webstories.render_pages', story)
+
+class WebStorySlide(DirtyFieldsMixin, WebBaseModel):
     order = models.PositiveIntegerField(default=1, help_text="Order of the slide in the story. Lower numbers appear first.")
     story = models.ForeignKey(WebStory, related_name='slides', on_delete=models.CASCADE)
     image = models.ImageField(upload_to='webstories_v2/slides/', help_text="Image for the slide. Recommended size: 600x800px.", null=True, blank=True)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_placeholder = models.TextField(blank=True, default='', editable=False, help_text="Tiny inline preview shown while the image loads")
     caption = models.TextField(help_text="Caption text overlay for the slide. Recommended length: 170-200 characters.", blank=True, null=True)
 
     class Meta:
@@ -108,14 +177,11 @@ class WebStorySlide(WebBaseModel):
         #     optimized_image = optimize_image(self.image)
         #     if optimized_image:
         #         self.image = optimized_image
-        try:
-            old_instance = WebStorySlide.objects.get(pk=self.pk)
-            image_changed = old_instance.image != self.image
-        except WebStorySlide.DoesNotExist:
-            image_changed = True
-        if image_changed and self.image:
-            optimized_image = optimize_image(self.image)
-            if optimized_image:
-                self.image = optimized_image
+        image_changed = self.has_changed('image')
+        if image_changed:
+            clear_image_metadata(self, 'image')
         super().save(*args, **kwargs)
+        if image_changed and self.image:
+            enqueue_job('webstories.slide_image', self, source=self.image.name)
+        self.story.mark_changed()
   
\ No newline at end of file
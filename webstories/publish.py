@@ -0,0 +1,125 @@
+"""
+Pre-rendered web story pages.
+
+Each story is rendered once per change, by the ``webstories.render_pages``
+media job, to a standalone HTML page and an AMP story. Both are kept in
+storage and in the cache, so a burst of shared-link traffic is served as
+stored bytes without templates or slide queries. The job also builds the
+story's manifest (slide images, captions and the next stories), which the
+page uses to preload what the reader will see next.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from akp_media.templatetags.media_tags import resized
+from .models import WebStory, story_cache_key
+
+PAGE_TEMPLATES = {
+    'html': 'news/webstories_html/story_detail.html',
+    'amp': 'news/webstories_html/story_amp.html',
+}
+
+
+def absolute_url(url):
+    return f"{settings.SITE_URL}{url}" if url.startswith('/') else url
+
+
+def story_card(story):
+    return {
+        'slug': story.slug,
+        'title': story.title,
+        'url': reverse('story_detail', kwargs={'slug': story.slug}),
+        'cover': resized(story.cover_image, settings.WEBSTORY_COVER_WIDTH),
+        'manifest': reverse('story_manifest', kwargs={'slug': story.slug}),
+    }
+
+
+def next_stories(story, count=2):
+    return (
+        WebStory.objects.filter(is_active=True, created_at__lt=story.created_at)
+        .order_by('-created_at')
+        .only('slug', 'title', 'cover_image')[:count]
+    )
+
+
+def build_story_manifest(story, slides):
+    return dict(
+        story_card(story),
+        slides=[
+            {
+                'image': slide.image_url,
+                'width': slide.image_width,
+                'height': slide.image_height,
+                'caption': slide.caption or '',
+            }
+            for slide in slides
+        ],
+        next=[story_card(next_story) for next_story in next_stories(story)],
+    )
+
+
+def story_context(story):
+    slides = list(story.slides.all())
+    for slide in slides:
+        # Proxy URLs don't expire, unlike signed storage URLs.
+        slide.image_url = resized(slide.image, settings.WEBSTORY_SLIDE_WIDTH)
+    return {
+        'story': story,
+        'slides': slides,
+        'manifest': build_story_manifest(story, slides),
+        'cover_url': absolute_url(resized(story.cover_image, settings.WEBSTORY_SLIDE_WIDTH)),
+        'canonical_url': absolute_url(reverse('story_detail', kwargs={'slug': story.slug})),
+        'amp_url': absolute_url(reverse('story_amp', kwargs={'slug': story.slug})),
+    }
+
+
+def render_story_page(story, variant, context=None):
+    return render_to_string(PAGE_TEMPLATES[variant], context or story_context(story))
+
+
+def stored_story_page(slug, variant):
+    """
+    The pre-rendered page for an active story, from the cache or storage.
+    None if the story doesn't exist or its pages are out of date.
+
+    Cache entries carry the content version they were rendered from and are
+    only served while it matches the row, so an edited, deactivated or
+    deleted story is never served from a stale entry.
+    """
+    story = (
+        WebStory.objects.filter(slug=slug, is_active=True)
+        .only('content_version', 'rendered_version', 'page_html', 'page_amp')
+        .first()
+    )
+    if story is None:
+        return None
+
+    key = story_cache_key(slug, variant)
+    entry = cache.get(key)
+    if entry is not None and entry[0] == story.content_version:
+        return entry[1]
+    if story.rendered_version != story.content_version:
+        return None
+
+    page_file = getattr(story, f'page_{variant}')
+    if not page_file:
+        return None
+    with page_file.open('rb') as stored:
+        page = stored.read()
+    cache.set(key, (story.content_version, page), settings.WEBSTORY_PAGE_CACHE_TIMEOUT)
+    return page
+
+
+def story_manifest(slug):
+    """
+    The manifest of an active story, stored on the row; built on the fly
+    while the story's render is pending. None for unknown stories.
+    """
+    story = WebStory.objects.filter(slug=slug, is_active=True).first()
+    if story is None:
+        return None
+    if story.manifest is None or story.rendered_version != story.content_version:
+        return story_context(story)['manifest']
+    return story.manifest
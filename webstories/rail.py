@@ -0,0 +1,50 @@
+"""
+The homepage web story rail.
+
+Pages of the rail are cached as lightweight cards under a version number
+that every story change bumps, so a new or edited story shows up on the
+next render and stale pages simply age out of the cache. Offsets are
+rounded down to a whole page and the rail ends at WEBSTORY_RAIL_MAX_OFFSET,
+so arbitrary ``?offset=`` values can't fill the cache with one-off pages.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import WebStory, rail_version
+from .publish import story_card
+
+
+def rail_card(story):
+    return dict(
+        story_card(story),
+        cover_width=story.cover_image_width,
+        cover_height=story.cover_image_height,
+        cover_placeholder=story.cover_image_placeholder,
+    )
+
+
+def story_rail(offset=0, limit=None):
+    """
+    ``{'stories': [card, ...], 'next_offset': int or None}`` for the active
+    stories from ``offset``, newest first.
+    """
+    limit = limit or settings.WEBSTORY_RAIL_SIZE
+    max_offset = settings.WEBSTORY_RAIL_MAX_OFFSET
+    offset -= offset % limit
+    if offset > max_offset:
+        return {'stories': [], 'next_offset': None}
+    key = f'webstory_rail:{rail_version()}:{offset}:{limit}'
+    page = cache.get(key)
+    if page is None:
+        stories = list(
+            WebStory.objects.filter(is_active=True)
+            .order_by('-created_at')
+            .only('slug', 'title', 'cover_image', 'cover_image_width', 'cover_image_height', 'cover_image_placeholder')
+            [offset:offset + limit + 1]
+        )
+        page = {
+            'stories': [rail_card(story) for story in stories[:limit]],
+            'next_offset': offset + limit if len(stories) > limit and offset + limit <= max_offset else None,
+        }
+        cache.set(key, page, settings.WEBSTORY_RAIL_CACHE_TIMEOUT)
+    return page
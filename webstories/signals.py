@@ -0,0 +1,21 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .models import WebStory, WebStorySlide, bump_rail_version, story_cache_key
+
+@receiver(post_delete, sender=WebStorySlide)
+def re_render_story_without_slide(sender, instance, **kwargs):
+    # Also runs for the slides of a deleted story, which no longer exists.
+    story = WebStory.objects.filter(pk=instance.story_id).first()
+    if story is not None:
+        story.mark_changed()
+
+@receiver(post_delete, sender=WebStory)
+def delete_story_pages(sender, instance, **kwargs):
+    cache.delete_many([story_cache_key(instance.slug, entry) for entry in WebStory.PAGE_VARIANTS])
+    bump_rail_version()
+    for story in instance.newer_neighbours():
+        story.mark_changed()
+    for page_file in (instance.page_html, instance.page_amp):
+        if page_file:
+            page_file.storage.delete(page_file.name)
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+
+from akp_media.jobs import register_task
+from akp_media.processing import commit_if_unchanged, register_image_task, save_derivative
+from .models import WebStory, story_cache_key
+from .publish import render_story_page, story_context
+
+# A processed image changes the URLs baked into the pre-rendered pages.
+register_image_task(
+    'webstories.cover_image', 'webstories.webstory', 'cover_image',
+    on_change=lambda story: story.mark_changed(neighbours=True),
+)
+register_image_task(
+    'webstories.slide_image', 'webstories.webstoryslide', 'image',
+    on_change=lambda slide: slide.story.mark_changed(),
+)
+
+
+@register_task('webstories.render_pages')
+def render_story_pages(story, job):
+    """
+    Render the HTML and AMP pages of a story to storage and the cache, and
+    its manifest to the row. If the story changes while rendering, the
+    output is discarded; the change has queued another run.
+    """
+    version = story.content_version
+    context = story_context(story)
+    pages = {variant: render_story_page(story, variant, context) for variant in WebStory.PAGE_VARIANTS}
+
+    values = {}
+    for variant, page in pages.items():
+        suffix = '' if variant == 'html' else f'.{variant}'
+        values[f'page_{variant}'] = save_derivative(
+            story, f'page_{variant}', ContentFile(page.encode(), name=f'{story.slug}-{version}{suffix}.html')
+        )
+    previous = [getattr(story, field_name) for field_name in values]
+
+    manifest = context['manifest']
+    if not commit_if_unchanged(story, 'content_version', version, rendered_version=version, manifest=manifest, **values):
+        for name in values.values():
+            story.page_html.storage.delete(name)
+        return
+
+    for page_file in previous:
+        if page_file:
+            page_file.storage.delete(page_file.name)
+    if story.is_active:
+        entries = {
+            story_cache_key(story.slug, variant): (version, page.encode()) for variant, page in pages.items()
+        }
+        cache.set_many(entries, settings.WEBSTORY_PAGE_CACHE_TIMEOUT)
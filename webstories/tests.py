@@ -1,3 +1,52 @@
-from django.test import TestCase
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+
+from .models import WebStory
+from .publish import stored_story_page
+from .tasks import render_story_pages
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'webstories-tests'}},
+    STORAGES={
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': MEDIA_ROOT}},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    },
+)
+class StoredPageTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def render(self, story):
+        render_story_pages(WebStory.objects.get(pk=story.pk), None)
+
+    def test_saving_a_stale_instance_keeps_the_pages_out_of_date(self):
+        story = WebStory.objects.create(title='Old title')
+        stale = WebStory.objects.get(pk=story.pk)
+
+        # A slide edit bumps the version and the worker renders it.
+        story.mark_changed()
+        self.render(story)
+        rendered = WebStory.objects.get(pk=story.pk)
+        self.assertEqual(rendered.rendered_version, rendered.content_version)
+        self.assertIn(b'Old title', stored_story_page(story.slug, 'html'))
+
+        # The editor saves the instance loaded before all that.
+        stale.title = 'New title'
+        stale.save()
+
+        saved = WebStory.objects.get(pk=story.pk)
+        self.assertEqual(saved.content_version, rendered.content_version + 1)
+        self.assertEqual(saved.rendered_version, rendered.rendered_version)
+        self.assertEqual(saved.page_html.name, rendered.page_html.name)
+        self.assertIsNone(stored_story_page(story.slug, 'html'))
+
+        self.render(story)
+        self.assertIn(b'New title', stored_story_page(story.slug, 'html'))
@@ -1,17 +1,37 @@
-from django.shortcuts import render, get_object_or_404
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
 from .models import WebStory
+from .publish import render_story_page, story_manifest, stored_story_page
+from .rail import story_rail
 # Create your views here.
 
+def story_page_response(slug, variant):
+  page = stored_story_page(slug, variant)
+  if page is None:
+    # Not rendered yet, or changed since: render this request live.
+    story = get_object_or_404(WebStory.objects.prefetch_related('slides'), slug=slug, is_active=True)
+    page = render_story_page(story, variant)
+  return HttpResponse(page, content_type='text/html; charset=utf-8')
+
 def story_detail(request, slug):
+  return story_page_response(slug, 'html')
 
-  story = get_object_or_404(
-    WebStory.objects.prefetch_related('slides'),
-    slug=slug,
-    is_active=True
-  )
+def story_amp(request, slug):
+  return story_page_response(slug, 'amp')
 
-  context = {
-    'story': story
-  }
+def story_manifest_view(request, slug):
+  manifest = story_manifest(slug)
+  if manifest is None:
+    raise Http404("Story not found.")
+  return JsonResponse(manifest)
 
-  return render(request, template_name='news/webstories_html/story_detail.html', context=context)
\ No newline at end of file
+def story_rail_api(request):
+  """
+  A page of the homepage story rail (``offset``), for loading older
+  stories as the reader scrolls.
+  """
+  try:
+    offset = max(int(request.GET.get('offset', 0)), 0)
+  except ValueError:
+    return JsonResponse({'status': 'error', 'message': 'Invalid offset.'}, status=400)
+  return JsonResponse(story_rail(offset))